@@ -0,0 +1,34 @@
+import json
+
+import redis.asyncio as aioredis
+
+from runtime.connections import get_async_redis
+from sensors.clock import mono_ns
+
+class AsyncSpeakerClient:
+    """
+    asyncio counterpart of SpeakerClient. By default it uses the process-wide
+    async pool from runtime.connections.
+    """
+
+    def __init__(self, redis: aioredis.Redis = None, url=None):
+        self.r = redis or (aioredis.from_url(url) if url else get_async_redis())
+
+    async def play_file(self, path):
+        """Instruct the service to play an audio file from disk."""
+        msg = json.dumps({'action': 'play_file', 'path': path})
+        await self.r.publish('audio:cmd', msg)
+
+    async def enqueue_raw(self, pcm_bytes):
+        """Push raw PCM bytes into the playback stream."""
+        await self.r.xadd('audio:stream', {'data': pcm_bytes, 'mono_ns': mono_ns()})
+
+    async def stop(self):
+        """Stop decoding and clear the stream."""
+        msg = json.dumps({'action': 'stop'})
+        await self.r.publish('audio:cmd', msg)
+
+    async def status(self):
+        """Get current playback state."""
+        state = await self.r.hgetall('audio:state')
+        return {k.decode(): v.decode() for k, v in state.items()}
@@ -1,9 +1,13 @@
 import redis
 import json
 
+from runtime.connections import get_redis
+from sensors.clock import mono_ns
+
 class SpeakerClient:
-    def __init__(self, url='redis://localhost'):
-        self.r = redis.from_url(url)
+    def __init__(self, url=None):
+        # a dedicated connection only if a URL is given, else the shared pool
+        self.r = redis.from_url(url) if url else get_redis()
 
     def play_file(self, path):
         """Instruct the service to play an audio file from disk."""
@@ -12,7 +16,7 @@ class SpeakerClient:
 
     def enqueue_raw(self, pcm_bytes):
         """Push raw PCM bytes into the playback stream."""
-        self.r.xadd('audio:stream', {'data': pcm_bytes})
+        self.r.xadd('audio:stream', {'data': pcm_bytes, 'mono_ns': mono_ns()})
 
     def stop(self):
         """Stop decoding and clear the stream."""
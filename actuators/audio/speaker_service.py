@@ -4,11 +4,20 @@ import subprocess
 import json
 import signal
 import sys
-import alsaaudio
+
+from runtime import metrics
+from runtime.connections import get_redis, Backoff, CONNECTION_ERRORS
+from sensors.clock import mono_ns
 
 class SpeakerService:
-    def __init__(self, redis_url="redis://localhost"):
-        self.r = redis.from_url(redis_url)
+    def __init__(self, redis_url=None, playback=None):
+        """
+        Args:
+            redis_url: dedicated Redis connection; defaults to the shared pool
+            playback: object with setchannels/setrate/setperiodsize/write,
+                      defaults to the ALSA default output (see benchmarks/null_sink.py)
+        """
+        self.r = redis.from_url(redis_url) if redis_url else get_redis()
         # Load or initialize audio configuration
         cfg = self.r.hgetall("audio:config")
         self.rate = int(cfg.get(b"rate", b"48000"))
@@ -19,8 +28,11 @@ class SpeakerService:
         self.cmd_channel = "audio:cmd"
 
         # ALSA setup
-        self.playback = alsaaudio.PCM(type=alsaaudio.PCM_PLAYBACK)
-        self.playback.setformat(alsaaudio.PCM_FORMAT_S16_LE)
+        if playback is None:
+            import alsaaudio
+            playback = alsaaudio.PCM(type=alsaaudio.PCM_PLAYBACK)
+            playback.setformat(alsaaudio.PCM_FORMAT_S16_LE)
+        self.playback = playback
         self.playback.setchannels(self.channels)
         self.playback.setrate(self.rate)
         self.playback.setperiodsize(self.chunk_size)
@@ -37,17 +49,26 @@ class SpeakerService:
     def _cmd_loop(self):
         pubsub = self.r.pubsub(ignore_subscribe_messages=True)
         pubsub.subscribe(self.cmd_channel)
-        for msg in pubsub.listen():
+        backoff = Backoff()
+        while True:
             try:
-                data = json.loads(msg['data'])
-            except Exception:
-                continue
-            action = data.get('action')
-            if action == 'play_file':
-                path = data.get('path')
-                self._start_decode(path)
-            elif action == 'stop':
-                self._stop_decode()
+                for msg in pubsub.listen():
+                    backoff.reset()
+                    self._handle_cmd(msg)
+            except CONNECTION_ERRORS:
+                backoff.sleep("SpeakerService")
+
+    def _handle_cmd(self, msg):
+        try:
+            data = json.loads(msg['data'])
+        except Exception:
+            return
+        action = data.get('action')
+        if action == 'play_file':
+            path = data.get('path')
+            self._start_decode(path)
+        elif action == 'stop':
+            self._stop_decode()
 
     def _start_decode(self, path):
         # Stop any existing decode
@@ -59,7 +80,8 @@ class SpeakerService:
             '-f', 's16le', '-ar', str(self.rate), '-ac', str(self.channels),
             'pipe:1'
         ]
-        self.decode_proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+        with metrics.timer("speaker.decode_start"):
+            self.decode_proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
         # Push PCM chunks into Redis stream
         threading.Thread(target=self._decode_loop, daemon=True).start()
         # Update state
@@ -86,26 +108,43 @@ class SpeakerService:
 
     def _play_loop(self):
         last_id = '0-0'
+        backoff = Backoff()
         while not self.stop_event.is_set():
             # Block until a new chunk arrives
-            entries = self.r.xread({self.stream_key: last_id}, block=0, count=1)
+            try:
+                entries = self.r.xread({self.stream_key: last_id}, block=0, count=1)
+                backoff.reset()
+            except CONNECTION_ERRORS:
+                backoff.sleep("SpeakerService")
+                continue
             if not entries:
                 continue
             for _, msgs in entries:
                 for msg_id, msg in msgs:
                     pcm = msg[b'data']
-                    self.playback.write(pcm)
+                    with metrics.timer("speaker.write"):
+                        self.playback.write(pcm)
+                    metrics.count("speaker.chunks")
+                    if b'mono_ns' in msg:
+                        # enqueued → handed to ALSA
+                        metrics.observe("speaker.latency", (mono_ns() - int(msg[b'mono_ns'])) / 1e6)
                     last_id = msg_id
 
     def stop(self):
         self.stop_event.set()
         self._stop_decode()
 
-if __name__ == '__main__':
+def main():
     svc = SpeakerService()
     def _shutdown(signum, frame):
         svc.stop()
         sys.exit(0)
-    signal.signal(signal.SIGINT, _shutdown)
-    signal.signal(signal.SIGTERM, _shutdown)
-    svc.start()
\ No newline at end of file
+    # handlers can only be installed from the main thread (not when supervised as a thread)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGINT, _shutdown)
+        signal.signal(signal.SIGTERM, _shutdown)
+    svc.start()
+
+if __name__ == '__main__':
+    metrics.start("speaker")
+    main()
\ No newline at end of file
@@ -1,71 +1,180 @@
 # record_mp3.py
+"""
+Records microphone audio from the audio stream straight to disk.
+
+PCM chunks are piped into an ffmpeg encoder as they arrive (or appended to
+a WAV file), so memory stays constant however long the recording runs.
+Recordings can be open-ended, rotate into fixed-length segment files, or be
+exported from the stream history instead of recorded live.
+
+    python -m applications.audio_recorder                          # 10s → output.mp3
+    python -m applications.audio_recorder -d 0 --segment 600 -o "mic-%Y%m%d-%H%M%S.mp3"
+    python -m applications.audio_recorder --since 300 -o last-5-minutes.wav
+"""
 
 import time
 import wave
-import tempfile
+import argparse
 import subprocess
-import os
 
 from sensors.audio.client import AudioClient
 from sensors.audio.config import SAMPLE_RATE, CHANNELS
+from utils.recording import segment_path
 
 # how long to record (seconds) and where to write
 DURATION_SECONDS = 10
 OUTPUT_MP3 = "output.mp3"
+SAMPLE_WIDTH = 2  # bytes (int16)
 
-def record_raw(duration: float) -> bytes:
+class WavWriter:
     """
-    Pull raw PCM chunks from the Redis stream for `duration` seconds.
+    Appends raw PCM to a WAV file; the header is fixed up as it grows.
+    Assumes 16-bit little-endian samples.
     """
-    client = AudioClient()
-    end_ts = time.time() + duration
-    buf = bytearray()
 
-    for chunk in client.stream_chunks():
-        buf.extend(chunk["pcm_bytes"])
-        if time.time() >= end_ts:
-            break
+    def __init__(self, path: str):
+        self.wf = wave.open(path, "wb")
+        self.wf.setnchannels(CHANNELS)
+        self.wf.setsampwidth(SAMPLE_WIDTH)
+        self.wf.setframerate(SAMPLE_RATE)
 
-    return bytes(buf)
+    def write(self, pcm: bytes):
+        self.wf.writeframes(pcm)
 
-def write_wav(raw_pcm: bytes, path: str):
+    def close(self):
+        self.wf.close()
+
+class EncoderWriter:
     """
-    Write raw PCM bytes to a WAV file.
-    Assumes 16-bit little-endian samples.
+    Streams raw PCM into ffmpeg's stdin; the codec follows the file extension
+    (.mp3, .ogg, .flac, .m4a...). Make sure ffmpeg is installed on your system.
     """
-    sample_width = 2  # bytes (int16)
-    with wave.open(path, "wb") as wf:
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(sample_width)
-        wf.setframerate(SAMPLE_RATE)
-        wf.writeframes(raw_pcm)
-
-def convert_wav_to_mp3(wav_path: str, mp3_path: str):
+
+    def __init__(self, path: str):
+        cmd = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", str(CHANNELS),
+            "-i", "pipe:0",
+        ]
+        if path.endswith(".mp3"):
+            cmd += ["-codec:a", "libmp3lame"]
+        # own session: Ctrl+C stops the recorder, which then lets ffmpeg finish the file
+        self.proc = subprocess.Popen(cmd + [path], stdin=subprocess.PIPE, start_new_session=True)
+
+    def write(self, pcm: bytes):
+        self.proc.stdin.write(pcm)
+
+    def close(self):
+        self.proc.stdin.close()
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with {self.proc.returncode}")
+
+def open_writer(path: str):
+    return WavWriter(path) if path.lower().endswith(".wav") else EncoderWriter(path)
+
+def chunk_started(chunk: dict, bytes_per_sec: int) -> float:
     """
-    Convert WAV → MP3 using ffmpeg.
-    Make sure ffmpeg is installed on your system.
+    Unix time of a chunk's first sample: its entry ID holds the ms it was
+    added to the stream, right after the chunk was captured.
     """
-    subprocess.run(
-        ["ffmpeg", "-y", "-i", wav_path, "-codec:a", "libmp3lame", mp3_path],
-        check=True
-    )
+    if "id" not in chunk:
+        return time.time()
+    added = int(chunk["id"].split("-")[0]) / 1000
+    return added - len(chunk["pcm_bytes"]) / bytes_per_sec
 
-def main():
-    print(f"▶ Recording {DURATION_SECONDS}s of audio…")
-    raw = record_raw(DURATION_SECONDS)
+class StreamingRecorder:
+    def __init__(self, output: str, duration: float = None, segment_seconds: float = None):
+        """
+        Args:
+            output: output path or strftime pattern; the extension picks the format
+            duration: seconds of audio to record, None for open-ended
+            segment_seconds: start a new file every this many seconds of audio
+        """
+        self.bytes_per_sec = bytes_per_sec = SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH
+        self.output = output
+        self.limit = int(duration * bytes_per_sec) if duration else None
+        self.segment_bytes = int(segment_seconds * bytes_per_sec) if segment_seconds else None
+        self.paths = []
 
-    # write to temp WAV
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        wav_path = tmp.name
-    write_wav(raw, wav_path)
-    print(f"✔ WAV written to {wav_path}")
+    def record(self, chunks) -> list:
+        """
+        Write chunks (as yielded by AudioClient) to disk until the duration
+        is reached or the chunks run out.
+        Returns:
+            the paths written
+        """
+        writer = None
+        written = 0      # bytes in total
+        in_segment = 0   # bytes in the current file
+        try:
+            for chunk in chunks:
+                pcm = chunk["pcm_bytes"]
+                # segments are named after the audio's capture time, not the
+                # time they are written: a history export writes many per second
+                chunk_start = chunk_started(chunk, self.bytes_per_sec)
+                offset = 0  # bytes of this chunk already written
+                if self.limit is not None:
+                    pcm = pcm[:self.limit - written]
+                while pcm:
+                    if writer is None or (self.segment_bytes and in_segment >= self.segment_bytes):
+                        if writer is not None:
+                            writer.close()
+                        started = chunk_start + offset / self.bytes_per_sec
+                        path = segment_path(self.output, len(self.paths), started,
+                                            bool(self.segment_bytes), self.paths)
+                        writer = open_writer(path)
+                        self.paths.append(path)
+                        in_segment = 0
+                        print(f"● Writing {path}")
+                    # split a chunk that straddles a segment boundary
+                    room = self.segment_bytes - in_segment if self.segment_bytes else len(pcm)
+                    part, pcm = pcm[:room], pcm[room:]
+                    writer.write(part)
+                    in_segment += len(part)
+                    written += len(part)
+                    offset += len(part)
+                if self.limit is not None and written >= self.limit:
+                    break
+        finally:
+            if writer is not None:
+                writer.close()
+        return self.paths
 
-    # convert to mp3
-    convert_wav_to_mp3(wav_path, OUTPUT_MP3)
-    print(f"✔ MP3 written to {OUTPUT_MP3}")
+def main():
+    parser = argparse.ArgumentParser(description="Record microphone audio to disk")
+    parser.add_argument("-o", "--output", default=OUTPUT_MP3,
+                        help="output file or strftime pattern; .wav is written directly, anything else through ffmpeg")
+    parser.add_argument("-d", "--duration", type=float, default=DURATION_SECONDS,
+                        help="seconds to record, 0 to record until interrupted")
+    parser.add_argument("--segment", type=float, metavar="SECONDS",
+                        help="rotate to a new file every SECONDS of audio")
+    parser.add_argument("--since", type=float, metavar="SECONDS_AGO",
+                        help="export from the stream history starting SECONDS_AGO instead of recording live")
+    parser.add_argument("--until", type=float, default=0, metavar="SECONDS_AGO",
+                        help="with --since, where the export ends (default: now)")
+    args = parser.parse_args()
+
+    client = AudioClient()
+    recorder = StreamingRecorder(args.output, args.duration or None, args.segment)
+    if args.since is not None:
+        now = time.time()
+        chunks = client.get_history(
+            start_id=str(int((now - args.since) * 1000)),
+            end_id=str(int((now - args.until) * 1000)),
+        )
+        recorder.limit = None  # the range decides the length
+        print(f"▶ Exporting {args.since - args.until:.0f}s of audio history…")
+    else:
+        chunks = client.stream_chunks()
+        length = f"{args.duration:.0f}s of audio" if args.duration else "until interrupted"
+        print(f"▶ Recording {length}…")
 
-    # cleanup
-    os.remove(wav_path)
+    try:
+        paths = recorder.record(chunks)
+    except KeyboardInterrupt:
+        paths = recorder.paths
+    for path in paths:
+        print(f"✔ Written {path}")
 
 if __name__ == "__main__":
     main()
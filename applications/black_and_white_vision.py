@@ -5,13 +5,14 @@ Converts it to gray scale. If a frame is completely white, saves it as a persist
 
 import time
 import cv2
-import numpy as np
 
 from sensors.vision.client import VisionClient
+from sensors.vision.analysis import FrameAnalyzer
 from sensors.vision.config import INTERVAL_SEC
 
 def main():
     client = VisionClient()
+    analyzer = FrameAnalyzer()
     last_id = None
 
     try:
@@ -23,15 +24,13 @@ def main():
                 continue
             last_id = frame_id
 
-            # convert to grayscale
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-            # detect full-white “white-out”
-            if np.all(gray == 255):
+            # detect “white-out” on a downscaled copy of the frame
+            if analyzer.update(frame).is_white_out():
                 print(f"[!] white-out detected in {frame_id!r}, marking persistent")
                 client.mark_persistent(frame_id, {'memory': 'white-out'})
             else:
                 print("Writing regular frame")
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
                 cv2.imwrite("Grayscale Feed.jpg", gray)
 
             time.sleep(INTERVAL_SEC)
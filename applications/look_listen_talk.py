@@ -0,0 +1,54 @@
+"""
+Simple application that listens, looks and talks on a single asyncio event loop.
+When it hears a loud sound (a clap), it checks whether the room is lit and,
+if so, plays a user-specified audio file through the speaker.
+"""
+
+import sys
+import asyncio
+
+import numpy as np
+
+from runtime.connections import get_async_redis
+from sensors.audio.async_client import AsyncAudioClient
+from sensors.vision.async_client import AsyncVisionClient
+from sensors.vision.analysis import FrameAnalyzer
+from actuators.audio.async_client import AsyncSpeakerClient
+
+CLAP_PEAK = 20_000   # int16 peak that counts as a clap
+MIN_BRIGHTNESS = 40  # mean gray level of a lit room
+
+async def watch(vision, analyzer, state):
+    async for frame_id, frame, meta in vision:
+        state["lit"] = analyzer.update(frame).mean() >= MIN_BRIGHTNESS
+
+async def listen(audio, speaker, state, path):
+    async for chunk in audio:
+        pcm = np.frombuffer(chunk["pcm_bytes"], dtype=np.int16)
+        if pcm.size and np.max(np.abs(pcm)) >= CLAP_PEAK and state["lit"]:
+            print("Clap heard in a lit room, talking back")
+            await speaker.play_file(path)
+
+async def main(path):
+    # one connection pool shared by all clients
+    r = get_async_redis()
+    vision = AsyncVisionClient(redis=r)
+    audio = AsyncAudioClient(redis=r)
+    speaker = AsyncSpeakerClient(redis=r)
+    state = {"lit": False}
+    try:
+        await asyncio.gather(
+            watch(vision, FrameAnalyzer(), state),
+            listen(audio, speaker, state, path),
+        )
+    finally:
+        await r.aclose()
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print(f"Usage: {sys.argv[0]} path/to/reply.wav")
+        sys.exit(1)
+    try:
+        asyncio.run(main(sys.argv[1]))
+    except KeyboardInterrupt:
+        print("Interrupted, exiting…")
@@ -1,8 +1,7 @@
 #!/usr/bin/env python3
-import redis
-import json
+from runtime.connections import get_redis
 
-r = redis.Redis.from_url("redis://localhost:6379/0")
+r = get_redis()
 last_id = "0-0"
 
 print("Waiting for new transcripts…")
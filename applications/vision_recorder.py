@@ -0,0 +1,216 @@
+"""
+Records the camera feed to disk, or a time-lapse of it.
+
+Frames arrive as JPEGs already, so they are never decoded or re-encoded:
+- .mjpeg / .mjpg outputs are the JPEGs back to back (play with `ffplay -f mjpeg`)
+- any other extension (.mkv, .avi, .mp4...) is muxed by ffmpeg with `-c:v copy`
+  (pass --encode to transcode to H.264 instead, at a CPU cost)
+
+Frame intake and disk writes run on separate threads with a bounded queue in
+between, so a slow SD card write drops frames on the recorder side instead of
+stalling the VisionClient listener. If writing fails (no ffmpeg, a broken
+pipe, a full disk) recording stops and stop() raises the error.
+
+    python -m applications.vision_recorder -d 60 -o clip.mkv
+    python -m applications.vision_recorder -d 0 --segment 900 -o "camera-%Y%m%d-%H%M%S.mkv"
+    python -m applications.vision_recorder -d 0 --timelapse 10 --fps 30 -o timelapse.mp4
+"""
+
+import time
+import queue
+import argparse
+import threading
+import subprocess
+
+from runtime import metrics
+from sensors.vision.client import VisionClient
+from sensors.vision.config import INTERVAL_SEC
+from utils.recording import segment_path
+
+OUTPUT = "camera.mkv"
+QUEUE_FRAMES = 256          # ~25 s at 10 fps before frames get dropped
+WRITE_BUFFER = 1 << 20      # batch small JPEG writes into 1 MiB SD card writes
+
+class MjpegWriter:
+    """Concatenated JPEGs: no container, no subprocess."""
+
+    def __init__(self, path: str):
+        self.f = open(path, "wb", buffering=WRITE_BUFFER)
+
+    def write(self, jpg: bytes):
+        self.f.write(jpg)
+
+    def close(self):
+        self.f.close()
+
+class FfmpegWriter:
+    """
+    Pipes the JPEGs into ffmpeg, which muxes them into the container named by
+    the file extension. Make sure ffmpeg is installed on your system.
+    """
+
+    def __init__(self, path: str, fps: float, encode: bool = False):
+        cmd = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "mjpeg", "-framerate", f"{fps:g}", "-i", "pipe:0",
+        ]
+        if encode:
+            cmd += ["-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p"]
+        else:
+            cmd += ["-c:v", "copy"]
+        # own session: Ctrl+C stops the recorder, which then lets ffmpeg finish the file
+        self.proc = subprocess.Popen(
+            cmd + [path], stdin=subprocess.PIPE, bufsize=WRITE_BUFFER, start_new_session=True
+        )
+
+    def write(self, jpg: bytes):
+        self.proc.stdin.write(jpg)
+
+    def close(self):
+        self.proc.stdin.close()
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with {self.proc.returncode}")
+
+def open_writer(path: str, fps: float, encode: bool = False):
+    if path.lower().endswith((".mjpeg", ".mjpg")):
+        return MjpegWriter(path)
+    return FfmpegWriter(path, fps, encode)
+
+class VisionRecorder:
+    def __init__(
+        self,
+        output: str,
+        fps: float,
+        segment_seconds: float = None,
+        timelapse_every: float = None,
+        encode: bool = False,
+        queue_frames: int = QUEUE_FRAMES,
+    ):
+        """
+        Args:
+            output: output path or strftime pattern; the extension picks the format
+            fps: frame rate written into the container
+            segment_seconds: start a new file every this many seconds of capture time
+            timelapse_every: keep only one frame per this many seconds
+            encode: transcode to H.264 instead of copying the JPEGs
+            queue_frames: frames buffered between intake and the disk writer
+        """
+        self.output = output
+        self.fps = fps
+        self.segment_seconds = segment_seconds
+        self.timelapse_every = timelapse_every
+        self.encode = encode
+        self.paths = []
+        self.frames = 0
+        self.dropped = 0
+        self.error = None  # why the writer thread stopped, if it failed
+        self._q = queue.Queue(maxsize=queue_frames)
+        self._last_kept = None
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def on_frame(self, frame_id: str, jpg: bytes, meta: dict):
+        """VisionClient listener: filter and enqueue, never blocks."""
+        if self.error is not None:
+            return
+        ts = meta.get("timestamp") or time.time()
+        if self.timelapse_every:
+            if self._last_kept is not None and ts - self._last_kept < self.timelapse_every:
+                return
+            self._last_kept = ts
+        try:
+            self._q.put_nowait((ts, jpg))
+        except queue.Full:
+            self.dropped += 1
+            metrics.count("vision_recorder.dropped")
+
+    def stop(self):
+        """
+        Flush queued frames and close the current file.
+        Returns:
+            the paths written
+        Raises:
+            the writer thread's error, if it failed
+        """
+        # a dead writer no longer drains the queue, so don't wait on a full one
+        while self._thread.is_alive():
+            try:
+                self._q.put(None, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.paths
+
+    def _write_loop(self):
+        writer = None
+        segment_start = None
+        try:
+            while True:
+                item = self._q.get()
+                if item is None:
+                    return
+                ts, jpg = item
+                if writer is None or (self.segment_seconds and ts - segment_start >= self.segment_seconds):
+                    if writer is not None:
+                        writer.close()
+                    path = segment_path(self.output, len(self.paths), ts, bool(self.segment_seconds), self.paths)
+                    writer = open_writer(path, self.fps, self.encode)
+                    self.paths.append(path)
+                    segment_start = ts
+                    print(f"● Writing {path}")
+                with metrics.timer("vision_recorder.write"):
+                    writer.write(jpg)
+                self.frames += 1
+        except Exception as e:
+            self.error = e
+            print(f"✖ Recording stopped: {e!r}", flush=True)
+        finally:
+            if writer is not None:
+                try:
+                    writer.close()
+                except Exception as e:
+                    self.error = self.error or e
+
+def main():
+    parser = argparse.ArgumentParser(description="Record the camera feed to disk")
+    parser.add_argument("-o", "--output", default=OUTPUT,
+                        help="output file or strftime pattern; .mjpeg is written directly, anything else through ffmpeg")
+    parser.add_argument("-d", "--duration", type=float, default=60,
+                        help="seconds to record, 0 to record until interrupted")
+    parser.add_argument("--segment", type=float, metavar="SECONDS",
+                        help="rotate to a new file every SECONDS")
+    parser.add_argument("--timelapse", type=float, metavar="SECONDS",
+                        help="keep one frame every SECONDS")
+    parser.add_argument("--fps", type=float,
+                        help="playback frame rate (default: the camera rate, or 25 for time-lapses)")
+    parser.add_argument("--encode", action="store_true",
+                        help="transcode to H.264 instead of copying the JPEGs")
+    args = parser.parse_args()
+
+    fps = args.fps or (25.0 if args.timelapse else 1.0 / INTERVAL_SEC)
+    recorder = VisionRecorder(args.output, fps, args.segment, args.timelapse, args.encode).start()
+    client = VisionClient(decode=False)
+    client.add_listener(recorder.on_frame)
+
+    length = f"{args.duration:.0f}s" if args.duration else "until interrupted"
+    print(f"▶ Recording {length}…")
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        while recorder.error is None and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+
+    paths = recorder.stop()
+    for path in paths:
+        print(f"✔ Written {path}")
+    print(f"{recorder.frames} frames written, {recorder.dropped} dropped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+benchmarks/fake_camera.py
+
+Synthetic camera: publishes recorded JPEGs (or generated frames) at a fixed
+rate through the same FramePublisher the real camera services use, so every
+consumer sees exactly the payloads it would see on the Pi.
+"""
+
+import os
+import glob
+import time
+import argparse
+
+import numpy as np
+import cv2
+
+from runtime import metrics
+from sensors.vision.config import RESOLUTION
+from sensors.vision.publisher import FramePublisher
+
+def load_frames(frames_dir: str):
+    """Raw bytes of every JPEG in a directory, in name order."""
+    paths = sorted(glob.glob(os.path.join(frames_dir, "*.jpg")) + glob.glob(os.path.join(frames_dir, "*.jpeg")))
+    if not paths:
+        raise SystemExit(f"No .jpg files in {frames_dir}")
+    frames = []
+    for path in paths:
+        with open(path, "rb") as f:
+            frames.append(f.read())
+    return frames
+
+def synthetic_frames(count: int, size=RESOLUTION):
+    """A moving bright disc on a gradient, JPEG-encoded once up front."""
+    w, h = size
+    base = np.tile(np.linspace(40, 200, w, dtype=np.uint8), (h, 1))
+    frames = []
+    for i in range(count):
+        img = cv2.cvtColor(base, cv2.COLOR_GRAY2BGR)
+        x = int((i / count) * w)
+        cv2.circle(img, (x, h // 2), h // 6, (255, 255, 255), -1)
+        ok, buf = cv2.imencode(".jpg", img)
+        frames.append(buf.tobytes())
+    return frames
+
+def run(frames, fps: float):
+    publisher = FramePublisher()
+    interval = 1.0 / fps
+    deadline = time.monotonic()
+    i = 0
+    while True:
+        # deadline pacing so publishing time doesn't lower the rate
+        deadline += interval
+        time.sleep(max(0.0, deadline - time.monotonic()))
+        timing = publisher.stamp()
+        publisher.publish(frames[i % len(frames)], timing)
+        i += 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish synthetic camera frames")
+    parser.add_argument("--fps", type=float, default=10.0)
+    parser.add_argument("--frames", metavar="DIR", help="replay the JPEGs in DIR instead of generated frames")
+    parser.add_argument("--count", type=int, default=30, help="number of generated frames to loop over")
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames) if args.frames else synthetic_frames(args.count)
+    print(f"Fake camera publishing {len(frames)} frames in a loop at {args.fps} fps")
+    try:
+        run(frames, args.fps)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    metrics.start("camera")
+    main()
@@ -0,0 +1,74 @@
+"""
+benchmarks/fake_microphone.py
+
+Synthetic microphone: publishes recorded PCM from a WAV file (or generated
+speech-like bursts) into the audio stream in real time, through the same
+AudioCaptureService.publish() the real capture callback uses.
+"""
+
+import time
+import wave
+import argparse
+
+import numpy as np
+
+from runtime import metrics
+from sensors.audio.audio_service import AudioCaptureService
+from sensors.audio.config import SAMPLE_RATE, CHANNELS, CHUNK_SIZE
+from sensors.clock import mono_ns
+
+def load_wav(path: str) -> bytes:
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise SystemExit("Only 16-bit WAV files are supported")
+        if wf.getframerate() != SAMPLE_RATE or wf.getnchannels() != CHANNELS:
+            raise SystemExit(
+                f"{path} is {wf.getframerate()}Hz/{wf.getnchannels()}ch, "
+                f"the pipeline expects {SAMPLE_RATE}Hz/{CHANNELS}ch"
+            )
+        return wf.readframes(wf.getnframes())
+
+def synthetic_pcm(seconds: float = 10.0) -> bytes:
+    """Alternating 1 s bursts of loud noisy tone and quiet noise."""
+    rng = np.random.default_rng(0)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    loud = (np.floor(t) % 2 == 0)
+    signal = np.where(loud, 8000 * np.sin(2 * np.pi * 220 * t), 0.0)
+    signal += rng.normal(0, 200, n)
+    mono = np.clip(signal, -32768, 32767).astype(np.int16)
+    return np.repeat(mono[:, None], CHANNELS, axis=1).tobytes()
+
+def run(pcm: bytes, speed: float):
+    svc = AudioCaptureService()
+    chunk_bytes = CHUNK_SIZE * CHANNELS * 2
+    interval = CHUNK_SIZE / SAMPLE_RATE / speed
+    deadline = time.monotonic()
+    offset = 0
+    while True:
+        deadline += interval
+        time.sleep(max(0.0, deadline - time.monotonic()))
+        chunk = pcm[offset:offset + chunk_bytes]
+        if len(chunk) < chunk_bytes:
+            offset = 0
+            chunk = pcm[:chunk_bytes]
+        offset += chunk_bytes
+        # the chunk "finished recording" now, like in the real callback
+        svc.publish(chunk, CHUNK_SIZE, mono_ns() - int(CHUNK_SIZE * 1e9 / SAMPLE_RATE))
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish synthetic microphone audio")
+    parser.add_argument("--wav", help="loop this 16-bit WAV instead of generated audio")
+    parser.add_argument("--speed", type=float, default=1.0, help="publish faster than real time")
+    args = parser.parse_args()
+
+    pcm = load_wav(args.wav) if args.wav else synthetic_pcm()
+    print(f"Fake microphone publishing {SAMPLE_RATE}Hz/{CHANNELS}ch, chunk={CHUNK_SIZE}, x{args.speed}")
+    try:
+        run(pcm, args.speed)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    metrics.start("audio_capture")
+    main()
@@ -0,0 +1,53 @@
+"""
+benchmarks/null_sink.py
+
+Runs SpeakerService against a null ALSA device that discards audio but
+blocks like a real one, so playback is paced at the configured rate.
+"""
+
+import sys
+import time
+import signal
+
+from runtime import metrics
+from actuators.audio.speaker_service import SpeakerService
+
+class NullPlayback:
+    """Stand-in for alsaaudio.PCM: accepts writes at real-time speed."""
+
+    def __init__(self):
+        self.rate = 48000
+        self.channels = 1
+        self.deadline = None
+
+    def setchannels(self, channels):
+        self.channels = channels
+
+    def setrate(self, rate):
+        self.rate = rate
+
+    def setperiodsize(self, size):
+        pass
+
+    def write(self, data):
+        frames = len(data) // (2 * self.channels)
+        now = time.monotonic()
+        if self.deadline is None or self.deadline < now:
+            self.deadline = now  # device underran; start over
+        self.deadline += frames / self.rate
+        # a real device blocks once its buffer is full; emulate one period
+        time.sleep(max(0.0, self.deadline - now - frames / self.rate))
+        return frames
+
+def main():
+    svc = SpeakerService(playback=NullPlayback())
+    def _shutdown(signum, frame):
+        svc.stop()
+        sys.exit(0)
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+    svc.start()
+
+if __name__ == '__main__':
+    metrics.start("speaker")
+    main()
@@ -0,0 +1,198 @@
+"""
+benchmarks/run.py
+
+End-to-end pipeline benchmark with synthetic sensors. No camera, microphone,
+sound card or OpenAI key needed.
+
+Starts the selected stages as separate processes, exactly as they run on the
+Pi but fed by fake sensors:
+    camera         benchmarks.fake_camera          → sensors:vision:frames
+    faces          middlewares.face_recognition     (VisionClient + face_recognition)
+    mic            benchmarks.fake_microphone      → audio:pcm:stream
+    transcription  middlewares.speech_transcription (against a local stub endpoint)
+    speaker        benchmarks.null_sink            ← audio:stream, fed in real time
+
+After a warm-up it measures for --duration seconds and reports, per stage:
+throughput, latency percentiles of every timer the stage exports through
+runtime.metrics, CPU and RSS of the process, and the Redis memory of the
+streams it writes.
+
+Run it against a scratch Redis database, e.g.
+    REDIS_URL=redis://localhost:6379/15 uv run -m benchmarks.run --duration 60
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+
+from runtime import metrics
+from runtime.connections import get_redis
+from sensors.audio.config import STREAM_NAME as AUDIO_STREAM
+from sensors.vision.config import HISTORY_STREAM
+from actuators.audio.client import SpeakerClient
+from benchmarks import stub_transcription
+
+STAGES = {
+    "camera":        {"module": "benchmarks.fake_camera",               "service": "camera",               "streams": [HISTORY_STREAM]},
+    "faces":         {"module": "middlewares.face_recognition.middleware", "service": "face_middleware",   "streams": ["vision:faces"]},
+    "mic":           {"module": "benchmarks.fake_microphone",           "service": "audio_capture",        "streams": [AUDIO_STREAM]},
+    "transcription": {"module": "middlewares.speech_transcription",     "service": "speech_transcription", "streams": ["audio:transcriptions"]},
+    "speaker":       {"module": "benchmarks.null_sink",                 "service": "speaker",              "streams": ["audio:stream"]},
+}
+
+PERCENTILES = (0.5, 0.95, 0.99)
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+def proc_stats(pid: int):
+    """(cpu seconds, rss bytes) of a process, from /proc."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            rss_pages = int(f.read().split()[1])
+    except OSError:
+        return None, None
+    cpu = (int(fields[11]) + int(fields[12])) / CLK_TCK  # utime + stime
+    return cpu, rss_pages * os.sysconf("SC_PAGE_SIZE")
+
+def read_metrics(r, service: str) -> dict:
+    data = r.hgetall(metrics.KEY_PREFIX + service)
+    return {k.decode(): json.loads(v) for k, v in data.items()}
+
+def diff_metrics(before: dict, after: dict, seconds: float) -> dict:
+    """Rates and percentiles of what happened between two snapshots."""
+    out = {}
+    for name, m in sorted(after.items()):
+        prev = before.get(name)
+        if m["type"] == "counter":
+            delta = m["value"] - (prev["value"] if prev else 0)
+            out[name] = {"per_sec": round(delta / seconds, 2), "total": delta}
+        elif m["type"] == "histogram":
+            counts = [a - (prev["counts"][i] if prev else 0) for i, a in enumerate(m["counts"])]
+            n = sum(counts)
+            if not n:
+                continue
+            total = m["sum"] - (prev["sum"] if prev else 0)
+            out[name] = {
+                "per_sec": round(n / seconds, 2),
+                "mean_ms": round(total / n, 3),
+                **{f"p{int(q * 100)}_ms": metrics.quantile(counts, q) for q in PERCENTILES},
+            }
+    return out
+
+def feed_speaker(stop: threading.Event, rate: int = 48000, chunk: int = 1024):
+    """Enqueue silent PCM at real-time pace, like an app playing audio."""
+    client = SpeakerClient()
+    silence = b"\0\0" * chunk
+    interval = chunk / rate
+    deadline = time.monotonic()
+    while not stop.is_set():
+        deadline += interval
+        time.sleep(max(0.0, deadline - time.monotonic()))
+        client.enqueue_raw(silence)
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark with synthetic sensors")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma separated, from: " + ", ".join(STAGES))
+    parser.add_argument("--duration", type=float, default=60.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=10.0, help="seconds before measuring")
+    parser.add_argument("--fps", type=float, default=10.0, help="fake camera rate")
+    parser.add_argument("--frames", metavar="DIR", help="JPEGs for the fake camera")
+    parser.add_argument("--wav", help="16-bit WAV for the fake microphone")
+    parser.add_argument("--transcribe-delay", type=float, default=0.5, help="stub API seconds per request")
+    parser.add_argument("--json", metavar="FILE", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    r = get_redis()
+    env = dict(os.environ, METRICS_EXPORT_SEC="1", PYTHONUNBUFFERED="1")
+    if "transcription" in stages:
+        stub = stub_transcription.serve(delay=args.transcribe_delay)
+        env["OPENAI_BASE_URL"] = f"http://127.0.0.1:{stub.server_address[1]}/v1"
+        env["OPENAI_API_KEY"] = "benchmark"
+
+    # a clean slate for the streams and metrics we measure
+    for stage in stages:
+        r.delete(metrics.KEY_PREFIX + STAGES[stage]["service"], *STAGES[stage]["streams"])
+
+    extra = {
+        "camera": ["--fps", str(args.fps)] + (["--frames", args.frames] if args.frames else []),
+        "mic": ["--wav", args.wav] if args.wav else [],
+    }
+    procs = {}
+    for stage in stages:
+        cmd = [sys.executable, "-m", STAGES[stage]["module"], *extra.get(stage, [])]
+        procs[stage] = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL)
+        print(f"started {stage} (pid {procs[stage].pid})")
+
+    stop = threading.Event()
+    if "speaker" in stages:
+        threading.Thread(target=feed_speaker, args=(stop,), daemon=True).start()
+
+    try:
+        time.sleep(args.warmup)
+        before = {s: (read_metrics(r, STAGES[s]["service"]), proc_stats(procs[s].pid)) for s in stages}
+        mem_before = r.info("memory")["used_memory"]
+        t0 = time.monotonic()
+        time.sleep(args.duration)
+        # give the exporters one more interval to flush
+        time.sleep(1.5)
+        elapsed = time.monotonic() - t0
+        after = {s: (read_metrics(r, STAGES[s]["service"]), proc_stats(procs[s].pid)) for s in stages}
+        mem_after = r.info("memory")["used_memory"]
+        # a stage that crashed during the run invalidates its numbers
+        alive = {s: procs[s].poll() is None for s in stages}
+    finally:
+        stop.set()
+        for p in procs.values():
+            p.terminate()
+        for p in procs.values():
+            try:
+                p.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    report = {"duration_sec": round(elapsed, 1), "redis_used_memory_delta": mem_after - mem_before, "stages": {}}
+    for stage in stages:
+        (m0, (cpu0, _)), (m1, (cpu1, rss)) = before[stage], after[stage]
+        streams = {}
+        for name in STAGES[stage]["streams"]:
+            if r.exists(name):
+                streams[name] = {"length": r.xlen(name), "memory_bytes": r.memory_usage(name, samples=5)}
+        report["stages"][stage] = {
+            "alive": alive[stage],
+            "cpu_percent": round((cpu1 - cpu0) / elapsed * 100, 1) if cpu0 is not None and cpu1 is not None else None,
+            "rss_mb": round(rss / 2**20, 1) if rss else None,
+            "metrics": diff_metrics(m0, m1, elapsed),
+            "streams": streams,
+        }
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+def print_report(report: dict):
+    print(f"\n=== {report['duration_sec']}s measured, Redis memory Δ {report['redis_used_memory_delta'] / 2**20:.1f} MB ===")
+    for stage, s in report["stages"].items():
+        status = "" if s["alive"] else "  (EXITED DURING RUN)"
+        print(f"\n[{stage}] cpu {s['cpu_percent']}%  rss {s['rss_mb']} MB{status}")
+        for name, m in s["metrics"].items():
+            if "p50_ms" in m:
+                print(f"  {name:32s} {m['per_sec']:8.2f}/s  mean {m['mean_ms']:8.2f}  "
+                      f"p50 {m['p50_ms']:8.2f}  p95 {m['p95_ms']:8.2f}  p99 {m['p99_ms']:8.2f} ms")
+            else:
+                print(f"  {name:32s} {m['per_sec']:8.2f}/s  ({m['total']} total)")
+        for name, st in s["streams"].items():
+            print(f"  stream {name}: {st['length']} entries, {st['memory_bytes'] / 1024:.0f} KB")
+
+if __name__ == "__main__":
+    main()
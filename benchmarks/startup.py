@@ -0,0 +1,147 @@
+"""
+benchmarks/startup.py
+
+Measures how fast each stage of the pipeline becomes useful after a cold start:
+    import_ms   time to import the stage's module (python -X importtime)
+    first_s     time from process start to its first unit of work
+                (first frame published / chunk captured / frame processed…),
+                seen through the stage's runtime.metrics export
+
+Stages are the same as in benchmarks/run.py, fed by the fake sensors. A
+consumer's producer (camera for faces, mic for transcription) is started
+and warmed up first, so only the consumer's own startup is measured.
+
+    REDIS_URL=redis://localhost:6379/15 uv run -m benchmarks.startup --repeat 3
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import threading
+import subprocess
+
+from runtime import metrics
+from runtime.connections import get_redis
+from benchmarks import stub_transcription
+from benchmarks.run import STAGES, feed_speaker
+
+# metrics whose first increment marks a stage as up
+READY = {
+    "camera":        ["camera.frames"],
+    "faces":         ["face.frame"],
+    "mic":           ["audio.chunks"],
+    "transcription": ["transcription.segments", "transcription.silent_segments"],
+    "speaker":       ["speaker.chunks"],
+}
+PRODUCER = {"faces": "camera", "transcription": "mic"}
+
+def import_ms(module: str, env: dict) -> float:
+    """Cumulative import time of `module` in a fresh interpreter."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True,
+    )
+    for line in out.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"could not import {module}:\n{out.stderr[-2000:]}")
+
+def is_ready(r, stage: str) -> bool:
+    data = r.hmget(metrics.KEY_PREFIX + STAGES[stage]["service"], READY[stage])
+    for raw in data:
+        if raw is None:
+            continue
+        m = json.loads(raw)
+        if m.get("count", m.get("value")):
+            return True
+    return False
+
+def start(stage: str, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", STAGES[stage]["module"]],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+
+def stop(proc: subprocess.Popen):
+    proc.terminate()
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+def time_to_first(r, stage: str, env: dict, timeout: float) -> float:
+    r.delete(metrics.KEY_PREFIX + STAGES[stage]["service"])
+    t0 = time.monotonic()
+    proc = start(stage, env)
+    try:
+        while time.monotonic() - t0 < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{stage} exited with {proc.returncode}")
+            if is_ready(r, stage):
+                return time.monotonic() - t0
+            time.sleep(0.02)
+        return None
+    finally:
+        stop(proc)
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time of each pipeline stage")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma separated, from: " + ", ".join(STAGES))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the median is reported")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for a stage's first output")
+    parser.add_argument("--json", metavar="FILE", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    r = get_redis()
+    # export often, so first_s is not rounded up to the export interval
+    env = dict(os.environ, METRICS_EXPORT_SEC="0.05", PYTHONUNBUFFERED="1")
+    if "transcription" in stages:
+        stub = stub_transcription.serve(delay=0.1)
+        env["OPENAI_BASE_URL"] = f"http://127.0.0.1:{stub.server_address[1]}/v1"
+        env["OPENAI_API_KEY"] = "benchmark"
+
+    report = {}
+    producers = {}
+    stop_feeding = threading.Event()
+    try:
+        for stage in stages:
+            producer = PRODUCER.get(stage)
+            if producer and producer not in producers:
+                producers[producer] = start(producer, env)
+                time.sleep(3)  # warm up
+            if stage == "speaker":
+                threading.Thread(target=feed_speaker, args=(stop_feeding,), daemon=True).start()
+
+            module = STAGES[stage]["module"]
+            imports = [import_ms(module, env) for _ in range(args.repeat)]
+            firsts = [time_to_first(r, stage, env, args.timeout) for _ in range(args.repeat)]
+            ok = [f for f in firsts if f is not None]
+            report[stage] = {
+                "module": module,
+                "import_ms": round(statistics.median(imports), 1),
+                "first_s": round(statistics.median(ok), 3) if ok else None,
+                "timeouts": len(firsts) - len(ok),
+            }
+            print(f"{stage:14s} import {report[stage]['import_ms']:8.1f} ms   "
+                  f"first output {report[stage]['first_s']} s", flush=True)
+    finally:
+        stop_feeding.set()
+        for proc in producers.values():
+            stop(proc)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+benchmarks/stub_transcription.py
+
+A local stand-in for the OpenAI transcription endpoint. Point the
+transcriber at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+Answers every upload with a fixed text after a configurable delay.
+"""
+
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+def make_handler(delay: float, text: str):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            # drain the upload like the real API would
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            time.sleep(delay)
+            if not self.path.endswith("/audio/transcriptions"):
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = text.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
+
+def serve(port: int = 0, delay: float = 0.5, text: str = "stub transcript"):
+    """
+    Start the stub in a background thread.
+    Returns:
+        the server; its port is server.server_address[1]
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(delay, text))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub transcription endpoint")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds per request")
+    args = parser.parse_args()
+    server = serve(args.port, args.delay)
+    print(f"Stub transcription endpoint on http://127.0.0.1:{args.port}/v1")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,222 @@
+"""
+middlewares/audio_features.py
+
+Derives cheaper audio representations from the microphone stream once, so
+consumers don't each pull and decode full-rate PCM:
+
+    RESAMPLED_STREAM  16 kHz mono int16 PCM, same fields as the capture stream
+                      (read it with AudioClient(stream=RESAMPLED_STREAM))
+    LEVELS_STREAM     per capture chunk: rms, peak
+    MEL_STREAM        log-mel frames (25 ms window, 10 ms hop), if AUDIO_MEL=1
+
+Resampling is polyphase: only the kept output samples are computed, each as a
+dot product with one phase of a Kaiser-windowed sinc low-pass, vectorized over
+the whole chunk. Filter state carries over between chunks, so the output is
+seamless.
+
+All entries carry mono_ns (see sensors/clock.py) of their first sample.
+"""
+
+import os
+import base64
+from math import gcd
+from datetime import datetime
+
+import numpy as np
+
+from runtime import metrics
+from runtime.connections import get_redis
+from runtime.policy import producer_maxlen
+from sensors.clock import mono_ns
+from sensors.audio.client import AudioClient
+from sensors.audio.config import (
+    SAMPLE_RATE, CHANNELS, CHUNK_SIZE, FEATURE_RATE,
+    RESAMPLED_STREAM, LEVELS_STREAM, MEL_STREAM,
+)
+
+# ——— Configuration ———
+MEL_ENABLED      = os.getenv("AUDIO_MEL", "0") == "1"
+N_MELS           = int(os.getenv("AUDIO_N_MELS", "40"))
+# at most one entry per capture chunk on every stream
+CHUNKS_PER_SEC   = SAMPLE_RATE / CHUNK_SIZE
+LEVELS_MAXLEN    = producer_maxlen(LEVELS_STREAM, CHUNKS_PER_SEC)
+RESAMPLED_MAXLEN = producer_maxlen(RESAMPLED_STREAM, CHUNKS_PER_SEC)
+MEL_MAXLEN       = producer_maxlen(MEL_STREAM, CHUNKS_PER_SEC)
+
+
+class PolyphaseResampler:
+    """
+    Streaming rational resampler (in_rate → out_rate) for float samples.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, half_width: int = 16, beta: float = 5.0):
+        """
+        Args:
+            half_width: zero crossings of the sinc on each side; more is
+                        sharper and slower
+            beta: Kaiser window shape
+        """
+        g = gcd(in_rate, out_rate)
+        self.up, self.down = out_rate // g, in_rate // g
+        L, M = self.up, self.down
+        # low-pass at the lower of the two Nyquist frequencies, designed at the upsampled rate
+        cutoff = 0.5 / max(L, M)
+        n = 2 * half_width * max(L, M) + 1
+        k = np.arange(n) - (n - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * k) * np.kaiser(n, beta) * L
+        self.taps = -(-n // L)  # taps per phase
+        h = np.concatenate([h, np.zeros(self.taps * L - n)])
+        # phases[p, j] = h[p + j*L]
+        self.phases = h.reshape(self.taps, L).T.astype(np.float32)
+        # filter delay, in input samples
+        self.delay = (n - 1) / 2 / L
+
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        self.t = 0          # upsampled time of the next output sample
+        self.consumed = 0   # input samples seen so far
+        self.produced = 0   # output samples emitted so far
+
+    def process(self, x: np.ndarray):
+        """
+        Resample one chunk.
+        Returns:
+            (output samples as float32,
+             position of the first output sample in input samples, relative
+             to the start of this chunk; negative when it falls in an earlier one)
+        """
+        L, M = self.up, self.down
+        buf = np.concatenate([self.history, x.astype(np.float32, copy=False)])
+        offset = self.consumed - len(self.history)  # input index of buf[0]
+        last_t = (offset + len(buf)) * L - 1        # latest upsampled time buf covers
+        count = (last_t - self.t) // M + 1 if self.t <= last_t else 0
+
+        ts = self.t + M * np.arange(count)
+        idx = (ts // L - offset)[:, None] - np.arange(self.taps)[None, :]
+        y = np.einsum("ij,ij->i", buf[idx], self.phases[ts % L])
+        first = self.t / L - self.delay - self.consumed
+
+        self.t += count * M
+        self.consumed += len(x)
+        self.produced += count
+        self.history = buf[len(buf) - (self.taps - 1):]
+        return y, first
+
+
+def mel_filterbank(rate: int, n_fft: int, n_mels: int, fmin: float = 20.0, fmax: float = None):
+    """Triangular filters on the HTK mel scale, shape (n_mels, n_fft // 2 + 1)."""
+    fmax = fmax or rate / 2
+    mels = np.linspace(2595 * np.log10(1 + fmin / 700), 2595 * np.log10(1 + fmax / 700), n_mels + 2)
+    hz = 700 * (10 ** (mels / 2595) - 1)
+    bins = np.fft.rfftfreq(n_fft, 1 / rate)
+    lower, center, upper = hz[:-2, None], hz[1:-1, None], hz[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+
+class LogMel:
+    """
+    Streaming log-mel spectrogram: feed samples, get every complete frame.
+    """
+
+    def __init__(self, rate: int = FEATURE_RATE, n_mels: int = N_MELS,
+                 win_ms: float = 25.0, hop_ms: float = 10.0):
+        self.rate = rate
+        self.win = int(rate * win_ms / 1000)
+        self.hop = int(rate * hop_ms / 1000)
+        self.n_fft = 1 << (self.win - 1).bit_length()
+        self.window = np.hanning(self.win).astype(np.float32)
+        self.fbank = mel_filterbank(rate, self.n_fft, n_mels)
+        self.buf = np.zeros(0, dtype=np.float32)
+        self.start = 0  # sample index of buf[0]
+
+    def process(self, x: np.ndarray):
+        """
+        Returns:
+            (frames: float32 array (n, n_mels),
+             sample index of the first returned frame's start)
+        """
+        self.buf = np.concatenate([self.buf, x.astype(np.float32, copy=False)])
+        n = (len(self.buf) - self.win) // self.hop + 1 if len(self.buf) >= self.win else 0
+        start = self.start
+        if not n:
+            return np.zeros((0, len(self.fbank)), dtype=np.float32), start
+        frames = np.lib.stride_tricks.sliding_window_view(self.buf, self.win)[::self.hop][:n]
+        spec = np.fft.rfft(frames * self.window, n=self.n_fft)
+        power = (spec.real ** 2 + spec.imag ** 2).astype(np.float32)
+        mel = np.log(power @ self.fbank.T + 1e-6)
+        self.buf = self.buf[n * self.hop:]
+        self.start += n * self.hop
+        return mel, start
+
+
+class AudioFeatureService:
+    def __init__(self, mel: bool = MEL_ENABLED):
+        self.redis = get_redis()
+        self.client = AudioClient()
+        self.resampler = PolyphaseResampler(SAMPLE_RATE, FEATURE_RATE)
+        self.logmel = LogMel(FEATURE_RATE) if mel else None
+
+    @metrics.timer("features.chunk")
+    def process(self, chunk: dict):
+        pcm = np.frombuffer(chunk["pcm_bytes"], dtype=np.int16)
+        if CHANNELS > 1:
+            samples = pcm.reshape(-1, CHANNELS).mean(axis=1, dtype=np.float32)
+        else:
+            samples = pcm.astype(np.float32)
+        if not samples.size:
+            return
+        ts = datetime.utcnow().isoformat()
+        chunk_ns = chunk.get("mono_ns", mono_ns())
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xadd(LEVELS_STREAM, {
+            "timestamp": ts,
+            "mono_ns": chunk_ns,
+            "rms": float(np.sqrt(np.mean(samples * samples))),
+            "peak": int(np.max(np.abs(samples))),
+        }, maxlen=LEVELS_MAXLEN, approximate=True)
+
+        seq = self.resampler.produced
+        out, first = self.resampler.process(samples)
+        if out.size:
+            out_ns = chunk_ns + int(first * 1e9 / SAMPLE_RATE)
+            pcm16 = np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+            pipe.xadd(RESAMPLED_STREAM, {
+                "timestamp": ts,
+                "mono_ns": out_ns,
+                "seq": seq,
+                "pcm_b64": base64.b64encode(pcm16.tobytes()).decode("ascii"),
+            }, maxlen=RESAMPLED_MAXLEN, approximate=True)
+
+            if self.logmel is not None:
+                frames, start = self.logmel.process(out)
+                if len(frames):
+                    pipe.xadd(MEL_STREAM, {
+                        "mono_ns": out_ns + int((start - seq) * 1e9 / FEATURE_RATE),
+                        "n_frames": len(frames),
+                        "n_mels": frames.shape[1],
+                        "hop_ms": self.logmel.hop * 1000 / FEATURE_RATE,
+                        "mel_b64": base64.b64encode(frames.astype(np.float16).tobytes()).decode("ascii"),
+                    }, maxlen=MEL_MAXLEN, approximate=True)
+        pipe.execute()
+        metrics.count("features.chunks")
+
+    def run(self):
+        print(f"AudioFeatureService {SAMPLE_RATE} Hz → {RESAMPLED_STREAM} ({FEATURE_RATE} Hz), "
+              f"{LEVELS_STREAM}" + (f", {MEL_STREAM}" if self.logmel else ""))
+        try:
+            for chunk in self.client.stream_chunks():
+                self.process(chunk)
+        except KeyboardInterrupt:
+            print("Stopping AudioFeatureService.")
+
+
+def main():
+    svc = AudioFeatureService()
+    svc.run()
+
+
+if __name__ == "__main__":
+    metrics.start("audio_features")
+    main()
@@ -1,14 +1,13 @@
-import redis
 from redis.commands.search.field import VectorField
 from redis.commands.search.index_definition import IndexDefinition, IndexType
 
-REDIS_HOST = "localhost"
-REDIS_PORT = 6379
+from runtime.connections import get_redis
+
 INDEX_NAME = "faces"
 KEY_PREFIX = "face:"
 
 def create_face_index(dimensions: int = 128):
-    r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
+    r = get_redis()
     try:
         r.ft(INDEX_NAME).info()
         print("Index already exists.")
@@ -1,30 +1,102 @@
-import os, time, json, logging
-import face_recognition
+import os, time, json, logging, argparse, threading
 import numpy as np
-import redis
 
+from runtime import metrics
+from runtime.connections import get_redis
+from runtime.policy import producer_maxlen
 from sensors.vision.client import VisionClient
+from sensors.vision.config import VISION_CHANNEL as VISION_CHAN, INTERVAL_SEC
 from .search import find_similar_faces
 
-REDIS_HOST    = os.getenv("VISION_REDIS_HOST", "localhost")
-REDIS_PORT    = int(os.getenv("VISION_REDIS_PORT", 6379))
-VISION_CHAN   = os.getenv("VISION_CHANNEL", "sensors:vision:frames")
+FACES_STREAM  = os.getenv("FACES_STREAM", "vision:faces")
+FACES_MAXLEN  = producer_maxlen(FACES_STREAM, 1 / INTERVAL_SEC)  # at most one entry per frame
+
+_face_recognition = None
+
+def load_models():
+    """
+    Import face_recognition, which loads the dlib models on import (seconds
+    on a Pi). Deferred to first use; main() warms it up in the background
+    while the vision client connects.
+    """
+    global _face_recognition
+    if _face_recognition is None:
+        with metrics.timer("face.load_models"):
+            import face_recognition
+        _face_recognition = face_recognition
+    return _face_recognition
+
+@metrics.timer("face.frame")
+def process_frame(fid, img):
+    """
+    Run face recognition on one BGR frame.
+    Returns the list of matches, or None if no face was found.
+    """
+    rgb = img[:, :, ::-1]
+    face_recognition = load_models()
+    with metrics.timer("face.encodings"):
+        encs = face_recognition.face_encodings(rgb)
+    if not encs:
+        return None
+    with metrics.timer("face.search"):
+        return find_similar_faces(np.array(encs[0]))
+
+def replay(seconds: float):
+    """
+    Re-run the middleware over the last `seconds` of the camera's frame
+    history and report throughput. Results are printed, not published.
+    """
+    vision = VisionClient(channel=VISION_CHAN)
+    start = time.time()
+    frames = faces = 0
+    for fid, img, meta in vision.replay(start=start - seconds):
+        frames += 1
+        matches = process_frame(fid, img)
+        if matches is None:
+            continue
+        faces += 1
+        print(json.dumps({"frame_id": fid, "timestamp": meta["timestamp"], "matches": matches}), flush=True)
+    elapsed = time.time() - start
+    logging.info("Replayed %d frames (%d with faces) in %.1fs, %.1f fps",
+                 frames, faces, elapsed, frames / elapsed if elapsed else 0.0)
 
 def main():
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
-    vision = VisionClient(host=REDIS_HOST, port=REDIS_PORT, channel=VISION_CHAN)
+    parser = argparse.ArgumentParser(description="Face recognition middleware")
+    parser.add_argument("--replay", type=float, metavar="SECONDS",
+                        help="process the last SECONDS of frame history instead of the live feed")
+    args = parser.parse_args()
+    if args.replay:
+        replay(args.replay)
+        return
+
+    threading.Thread(target=load_models, daemon=True).start()
+    vision = VisionClient(channel=VISION_CHAN)
+    r = get_redis()
     logging.info("Face middleware started…")
 
+    last_fid = None
     while True:
         try:
-            fid, img = vision.read(timeout=1.0)
-            rgb = img[:, :, ::-1]
-            encs = face_recognition.face_encodings(rgb)
-            if not encs:
+            fid, img, meta = vision.read(timeout=1.0, with_meta=True)
+            # read() returns the latest frame; don't process it twice
+            if fid == last_fid:
+                time.sleep(0.01)
+                continue
+            last_fid = fid
+            matches = process_frame(fid, img)
+            if matches is None:
                 continue
-            matches = find_similar_faces(np.array(encs[0]))
             output = {"frame_id": fid, "timestamp": time.time(), "matches": matches}
             print(json.dumps(output), flush=True)
+            # time-indexed on the frame's capture time so it can be fused
+            if meta.get("mono_ns") is not None:
+                r.xadd(FACES_STREAM, {
+                    "frame_id": fid,
+                    "mono_ns": meta["mono_ns"],
+                    "seq": meta["seq"],
+                    "matches": json.dumps(matches),
+                }, maxlen=FACES_MAXLEN, approximate=True)
         except TimeoutError:
             continue
         except Exception:
@@ -32,4 +104,5 @@ def main():
             time.sleep(1)
 
 if __name__ == "__main__":
+    metrics.start("face_middleware")
     main()
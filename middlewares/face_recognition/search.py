@@ -1,16 +1,15 @@
-import redis
 from redis.commands.search.query import Query
 import numpy as np
 
-REDIS_HOST = "localhost"
-REDIS_PORT = 6379
+from runtime.connections import get_redis
+
 INDEX_NAME = "faces"
 TOP_K = 5
 MATCH_THRESHOLD = 0.6
 
 def find_similar_faces(embedding: np.ndarray):
     vec = embedding.astype(np.float32).tobytes()
-    r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
+    r = get_redis()
     q = (
         Query(f"*=>[KNN {TOP_K} @embedding $vec AS score]")
         .sort_by("score")
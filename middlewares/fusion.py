@@ -0,0 +1,177 @@
+"""
+middlewares/fusion.py
+
+Joins face-recognition results, speech segments and audio energy into a
+single time-indexed stream. Audio energy comes from the per-chunk levels
+published by middlewares/audio_features.py, not from the raw PCM.
+
+All inputs are stamped on the shared monotonic clock (see sensors/clock.py).
+Time is cut into fixed windows; a window is emitted once every input has
+moved past its end, or once it is older than MAX_LATENESS_SEC, whichever
+comes first. Late events for an already emitted window are dropped.
+
+Each entry in FUSION_STREAM looks like:
+    window_start_ns, window_end_ns: window bounds (mono_ns)
+    faces:       JSON list of {"frame_id", "matches"}
+    speech:      JSON list of {"segment_id", "text"} overlapping the window
+    audio_rms:   mean RMS of the mic chunks in the window
+    audio_peak:  max absolute sample in the window
+    audio_chunks: number of mic chunks in the window
+"""
+
+import os
+import json
+from collections import defaultdict
+
+import numpy as np
+
+from runtime import metrics
+from runtime.connections import get_redis, Backoff, CONNECTION_ERRORS
+from runtime.policy import producer_maxlen
+from sensors.audio.config import LEVELS_STREAM
+from sensors.clock import mono_ns
+
+# ——— Configuration ———
+FACES_STREAM       = os.getenv("FACES_STREAM", "vision:faces")
+TRANSCRIPT_STREAM  = os.getenv("TRANSCRIPT_STREAM", "audio:transcriptions")
+FUSION_STREAM      = os.getenv("FUSION_STREAM", "fusion:events")
+WINDOW_SEC         = float(os.getenv("FUSION_WINDOW_SEC", "0.5"))
+# transcripts arrive a whole segment plus API latency after the fact
+MAX_LATENESS_SEC   = float(os.getenv("FUSION_MAX_LATENESS_SEC", "10.0"))
+FUSION_MAXLEN      = producer_maxlen(FUSION_STREAM, 1 / WINDOW_SEC)
+
+FACES, SPEECH, AUDIO = "faces", "speech", "audio"
+
+
+class WindowJoiner:
+    """
+    Tumbling-window join over several time-stamped inputs with bounded lateness.
+    Events are (start_ns, end_ns) spans; an event is added to every window it
+    overlaps, so a 5 s speech segment shows up in each window it covers.
+    """
+
+    def __init__(self, window_ns: int, lateness_ns: int, modalities):
+        self.window_ns   = window_ns
+        self.lateness_ns = lateness_ns
+        self.pending     = {}  # window_start_ns -> {modality: [events]}
+        self.watermarks  = {m: 0 for m in modalities}
+        self.closed_until = 0  # everything before this has been emitted
+        self.dropped     = 0
+
+    def add(self, modality: str, start_ns: int, end_ns: int, event):
+        self.watermarks[modality] = max(self.watermarks[modality], end_ns)
+        if end_ns < self.closed_until:
+            self.dropped += 1
+            return
+        w = self.window_ns
+        first = max(start_ns // w * w, self.closed_until)
+        for ws in range(first, end_ns + 1, w):
+            self.pending.setdefault(ws, defaultdict(list))[modality].append(event)
+
+    def ready(self, now_ns: int):
+        """
+        Pop every window that can no longer receive events, oldest first.
+        Yields (window_start_ns, {modality: [events]}).
+        """
+        horizon = max(min(self.watermarks.values()), now_ns - self.lateness_ns)
+        for ws in sorted(self.pending):
+            if ws + self.window_ns > horizon:
+                break
+            self.closed_until = ws + self.window_ns
+            yield ws, self.pending.pop(ws)
+
+
+class FusionService:
+    def __init__(self):
+        self.redis = get_redis()
+        self.joiner = WindowJoiner(
+            int(WINDOW_SEC * 1e9),
+            int(MAX_LATENESS_SEC * 1e9),
+            [FACES, SPEECH, AUDIO],
+        )
+        self.last_ids = None  # resolved on the first read, see _start_ids
+
+    def _start_ids(self) -> dict:
+        """
+        Current last entry ID of every input, so only what happens from now
+        on is fused. "$" can't be used for this: on every XREAD it means
+        "after the newest entry *now*", so a stream that is still quiet
+        would lose whatever is written between two polls.
+        """
+        ids = {}
+        for stream in (FACES_STREAM, TRANSCRIPT_STREAM, LEVELS_STREAM):
+            last = self.redis.xrevrange(stream, count=1)
+            ids[stream] = last[0][0] if last else "0-0"
+        return ids
+
+    def _ingest(self, stream: str, fields: dict):
+        if b"mono_ns" not in fields and b"start_mono_ns" not in fields:
+            return  # producer predates the shared clock
+        if stream == LEVELS_STREAM:
+            ts = int(fields[b"mono_ns"])
+            self.joiner.add(AUDIO, ts, ts, (float(fields[b"rms"]), int(fields[b"peak"])))
+        elif stream == FACES_STREAM:
+            ts = int(fields[b"mono_ns"])
+            self.joiner.add(FACES, ts, ts, {
+                "frame_id": fields[b"frame_id"].decode(),
+                "matches": json.loads(fields[b"matches"]),
+            })
+        elif stream == TRANSCRIPT_STREAM:
+            self.joiner.add(
+                SPEECH,
+                int(fields[b"start_mono_ns"]),
+                int(fields[b"end_mono_ns"]),
+                {
+                    "segment_id": fields[b"segment_id"].decode(),
+                    "text": fields[b"text"].decode(),
+                },
+            )
+
+    def _emit(self, window_start: int, events: dict):
+        audio = events.get(AUDIO, [])
+        entry = {
+            "window_start_ns": window_start,
+            "window_end_ns":   window_start + self.joiner.window_ns,
+            "faces":           json.dumps(events.get(FACES, [])),
+            "speech":          json.dumps(events.get(SPEECH, [])),
+            "audio_rms":       float(np.mean([a[0] for a in audio])) if audio else 0.0,
+            "audio_peak":      max((a[1] for a in audio), default=0),
+            "audio_chunks":    len(audio),
+        }
+        self.redis.xadd(FUSION_STREAM, entry, maxlen=FUSION_MAXLEN, approximate=True)
+        metrics.count("fusion.windows")
+        metrics.gauge("fusion.dropped", self.joiner.dropped)
+
+    def run(self):
+        print(f"FusionService joining {FACES_STREAM}, {TRANSCRIPT_STREAM}, {LEVELS_STREAM} → {FUSION_STREAM}")
+        backoff = Backoff()
+        try:
+            while True:
+                # one blocking read across all inputs
+                try:
+                    if self.last_ids is None:
+                        self.last_ids = self._start_ids()
+                    resp = self.redis.xread(self.last_ids, block=200, count=500)
+                    backoff.reset()
+                except CONNECTION_ERRORS:
+                    backoff.sleep("FusionService")
+                    continue
+                for stream, entries in resp or []:
+                    name = stream.decode()
+                    for entry_id, fields in entries:
+                        self.last_ids[name] = entry_id
+                        self._ingest(name, fields)
+                for window_start, events in self.joiner.ready(mono_ns()):
+                    self._emit(window_start, events)
+        except KeyboardInterrupt:
+            print("Stopping FusionService.")
+
+
+def main():
+    svc = FusionService()
+    svc.run()
+
+
+if __name__ == "__main__":
+    metrics.start("fusion")
+    main()
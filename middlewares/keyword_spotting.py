@@ -0,0 +1,221 @@
+"""
+middlewares/keyword_spotting.py
+
+On-device keyword spotting: no model download, no network.
+
+Keywords are enrolled from a few short recordings each. A recording becomes
+a template of log-mel frames; the live 16 kHz audio from
+middlewares/audio_features.py is turned into the same frames and matched
+against every template with streaming subsequence DTW (one vectorized step
+per 10 ms frame, local slopes ½–2 so the keyword may be said faster or
+slower). A detection is published as soon as the end of the keyword is
+heard:
+
+    KEYWORD_STREAM  keyword, score, start_mono_ns, end_mono_ns, latency_ms
+
+Enroll, then run:
+    uv run -m middlewares.keyword_spotting --enroll hey_chakna take1.wav take2.wav take3.wav
+    uv run -m middlewares.keyword_spotting
+
+The transcriber can be gated on detections, see TRANSCRIBE_ON_KEYWORD in
+middlewares/speech_transcription.py.
+"""
+
+import os
+import time
+import wave
+import argparse
+
+import numpy as np
+
+from runtime import metrics
+from runtime.connections import get_redis
+from runtime.policy import producer_maxlen
+from sensors.clock import mono_ns
+from sensors.audio.client import AudioClient
+from sensors.audio.config import FEATURE_RATE, RESAMPLED_STREAM
+from middlewares.audio_features import LogMel, PolyphaseResampler
+
+# ——— Configuration ———
+KEYWORD_STREAM   = os.getenv("KEYWORD_STREAM", "audio:keywords")
+TEMPLATE_PREFIX  = "kws:template:"   # + keyword:index
+THRESHOLD        = float(os.getenv("KWS_THRESHOLD", "0.25"))      # mean cosine distance per frame
+REFRACTORY_SEC   = float(os.getenv("KWS_REFRACTORY_SEC", "1.0"))  # ignore repeats of a keyword this long
+SILENCE_DB       = 40.0  # enrollment: frames this far below the loudest are trimmed
+
+
+def normalize(frames: np.ndarray) -> np.ndarray:
+    """Remove each frame's mean (overall gain) and scale it to unit length."""
+    frames = frames - frames.mean(axis=1, keepdims=True)
+    return frames / (np.linalg.norm(frames, axis=1, keepdims=True) + 1e-6)
+
+
+def make_template(wav_path: str) -> np.ndarray:
+    """Log-mel frames of the speech in a WAV file, leading and trailing silence trimmed."""
+    with wave.open(wav_path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError("Only 16-bit WAV files are supported")
+        rate, channels = wf.getframerate(), wf.getnchannels()
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    samples = pcm.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    if rate != FEATURE_RATE:
+        resampler = PolyphaseResampler(rate, FEATURE_RATE)
+        # pad with the filter delay so the tail comes out too
+        tail = np.zeros(int(resampler.delay) + 1, dtype=np.float32)
+        samples = np.concatenate([resampler.process(samples)[0], resampler.process(tail)[0]])
+    frames, _ = LogMel(FEATURE_RATE).process(samples)
+    energy = frames.mean(axis=1)
+    loud = np.nonzero(energy > energy.max() - SILENCE_DB / 10 * np.log(10))[0]
+    if not len(loud):
+        raise ValueError(f"No speech found in {wav_path}")
+    return frames[loud[0]:loud[-1] + 1]
+
+
+def enroll(keyword: str, wav_paths):
+    """Store one template per recording for `keyword`, replacing earlier ones."""
+    r = get_redis()
+    for key in r.scan_iter(f"{TEMPLATE_PREFIX}{keyword}:*"):
+        r.delete(key)
+    for i, path in enumerate(wav_paths):
+        frames = make_template(path)
+        r.hset(f"{TEMPLATE_PREFIX}{keyword}:{i}", mapping={
+            "keyword": keyword,
+            "n_mels": frames.shape[1],
+            "frames": frames.astype(np.float32).tobytes(),
+        })
+        print(f"Enrolled {keyword!r} from {path} ({len(frames)} frames)")
+
+
+def load_templates(r) -> list:
+    """[(keyword, frames)] of every enrolled template."""
+    templates = []
+    for key in r.scan_iter(f"{TEMPLATE_PREFIX}*"):
+        fields = r.hgetall(key)
+        frames = np.frombuffer(fields[b"frames"], dtype=np.float32)
+        templates.append((fields[b"keyword"].decode(), frames.reshape(-1, int(fields[b"n_mels"]))))
+    return templates
+
+
+class TemplateMatcher:
+    """
+    Streaming subsequence DTW of one template against the live frames.
+    After each input frame, step() returns the mean distance of the best
+    alignment of the whole template ending at that frame.
+
+    Each input frame advances the alignment by 0, 1 or 2 template frames,
+    and never by 0 twice in a row: the keyword may be spoken up to twice
+    as fast or twice as slow as the template.
+    """
+
+    def __init__(self, keyword: str, template: np.ndarray):
+        self.keyword = keyword
+        self.template = normalize(template).astype(np.float32)
+        n = len(self.template)
+        self.cost = np.full(n, np.inf, dtype=np.float32)   # accumulated cost ending at template frame i
+        self.length = np.zeros(n, dtype=np.int32)          # input frames on that path
+        self.stayed = np.zeros(n, dtype=bool)              # that path's last step kept the template frame
+        self._cols = np.arange(n)
+
+    def step(self, frame: np.ndarray) -> float:
+        """Advance by one normalized input frame; returns the score."""
+        dist = 1.0 - self.template @ frame
+        inf = np.float32(np.inf)
+        # predecessors: same template frame (slower speech, but not twice in
+        # a row), the previous one, or the one before (faster speech)
+        stay = np.where(self.stayed, inf, self.cost)
+        cost = np.stack([stay, np.r_[inf, self.cost[:-1]], np.r_[inf, inf, self.cost[:-2]]])
+        length = np.stack([self.length, np.r_[0, self.length[:-1]], np.r_[0, 0, self.length[:-2]]])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            best = np.argmin(np.where(length > 0, cost / length, inf), axis=0)
+        cost, length = cost[best, self._cols], length[best, self._cols]
+        self.stayed = best == 0
+        # a match may start at any input frame
+        cost[0], length[0], self.stayed[0] = 0.0, 0, False
+        self.cost = cost + dist
+        self.length = length + 1
+        return float(self.cost[-1] / self.length[-1])
+
+
+class KeywordSpotter:
+    def __init__(self, threshold: float = THRESHOLD):
+        self.redis = get_redis()
+        self.client = AudioClient(stream=RESAMPLED_STREAM)
+        self.logmel = LogMel(FEATURE_RATE)
+        self.threshold = threshold
+        self.matchers = [TemplateMatcher(k, t) for k, t in load_templates(self.redis)]
+        self.last_hit = {}  # keyword -> mono_ns of its last detection
+        # each keyword is reported at most once per REFRACTORY_SEC
+        keywords = {m.keyword for m in self.matchers}
+        self.maxlen = producer_maxlen(KEYWORD_STREAM, len(keywords) / REFRACTORY_SEC)
+        self.hop_ns = self.logmel.hop * 1_000_000_000 // FEATURE_RATE
+        self.win_ns = self.logmel.win * 1_000_000_000 // FEATURE_RATE
+
+    @metrics.timer("kws.chunk")
+    def process(self, chunk: dict):
+        samples = np.frombuffer(chunk["pcm_bytes"], dtype=np.int16)
+        # LogMel sample index of this chunk's first sample
+        chunk_start = self.logmel.start + len(self.logmel.buf)
+        frames, start = self.logmel.process(samples)
+        if not len(frames):
+            return
+        # mono_ns of the first frame's start, from the chunk's first sample
+        chunk_ns = chunk.get("mono_ns", mono_ns())
+        first_ns = chunk_ns + (start - chunk_start) * 1_000_000_000 // FEATURE_RATE
+        for i, frame in enumerate(normalize(frames)):
+            end_ns = first_ns + i * self.hop_ns + self.win_ns
+            hits = {}
+            for m in self.matchers:
+                score = m.step(frame)
+                if score < self.threshold and score < hits.get(m.keyword, (np.inf,))[0]:
+                    hits[m.keyword] = (score, m.length[-1])
+            for keyword, (score, length) in hits.items():
+                self._detected(keyword, score, end_ns - int(length) * self.hop_ns, end_ns)
+
+    def _detected(self, keyword: str, score: float, start_ns: int, end_ns: int):
+        last = self.last_hit.get(keyword)
+        if last is not None and end_ns - last < REFRACTORY_SEC * 1e9:
+            return
+        self.last_hit[keyword] = end_ns
+        # from the end of the keyword being spoken to the detection
+        latency_ms = round((mono_ns() - end_ns) / 1e6, 1)
+        self.redis.xadd(KEYWORD_STREAM, {
+            "keyword": keyword,
+            "score": round(score, 4),
+            "start_mono_ns": start_ns,
+            "end_mono_ns": end_ns,
+            "latency_ms": latency_ms,
+        }, maxlen=self.maxlen, approximate=True)
+        metrics.count("kws.detections")
+        metrics.observe("kws.latency", latency_ms)
+        print(f"[{time.strftime('%H:%M:%S')}] {keyword} (score {score:.3f}, {latency_ms} ms)", flush=True)
+
+    def run(self):
+        if not self.matchers:
+            raise SystemExit("No keywords enrolled, see --enroll")
+        keywords = sorted({m.keyword for m in self.matchers})
+        print(f"KeywordSpotter listening on {RESAMPLED_STREAM} for {', '.join(keywords)} → {KEYWORD_STREAM}")
+        try:
+            for chunk in self.client.stream_chunks():
+                self.process(chunk)
+        except KeyboardInterrupt:
+            print("Stopping KeywordSpotter.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="On-device keyword spotting")
+    parser.add_argument("--enroll", nargs="+", metavar=("KEYWORD", "WAV"),
+                        help="enroll KEYWORD from one or more WAV recordings of it, then exit")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="detection threshold (mean cosine distance, lower is stricter)")
+    args = parser.parse_args()
+    if args.enroll:
+        if len(args.enroll) < 2:
+            parser.error("--enroll needs a keyword and at least one WAV file")
+        enroll(args.enroll[0], args.enroll[1:])
+        return
+    KeywordSpotter(args.threshold).run()
+
+
+if __name__ == "__main__":
+    metrics.start("keyword_spotting")
+    main()
@@ -8,14 +8,12 @@ import json
 from datetime import datetime
 
 import numpy as np
-import openai
-import redis
 
+from runtime import metrics
+from runtime.connections import get_redis, Backoff, CONNECTION_ERRORS
+from sensors.clock import mono_ns
 from sensors.audio.client import AudioClient
-from sensors.audio.config import REDIS_URL, SAMPLE_RATE, CHANNELS
-from dotenv import load_dotenv
-
-load_dotenv()
+from sensors.audio.config import SAMPLE_RATE, CHANNELS, FEATURE_RATE, RESAMPLED_STREAM
 
 # ——— Configuration ———
 TRANSCRIPT_STREAM      = os.getenv("TRANSCRIPT_STREAM", "audio:transcriptions")
@@ -24,23 +22,33 @@ MODEL_NAME             = os.getenv("TRANSCRIPTION_MODEL", "gpt-4o-transcribe")
 CHUNK_DURATION_SEC     = float(os.getenv("CHUNK_DURATION_SEC", "5.0"))
 OVERLAP_SEC            = float(os.getenv("OVERLAP_SEC", "1.0"))
 SILENCE_THRESHOLD      = int(os.getenv("SILENCE_THRESHOLD", "500"))
-
-# Ensure OpenAI key is set
-oai_key = os.getenv("OPENAI_API_KEY")
-if not oai_key:
-    raise RuntimeError("Please set OPENAI_API_KEY in your environment")
-openai.api_key = oai_key
+# read 16 kHz mono from middlewares/audio_features.py instead of the raw capture
+# stream: a third of the bytes to read and upload at 48 kHz
+USE_RESAMPLED          = os.getenv("TRANSCRIBE_RESAMPLED", "0") == "1"
+# only transcribe speech following a keyword from middlewares/keyword_spotting.py:
+# comma-separated keywords, or * for any; empty transcribes everything
+GATE_KEYWORDS          = [k.strip() for k in os.getenv("TRANSCRIBE_ON_KEYWORD", "").split(",") if k.strip()]
+GATE_WINDOW_SEC        = float(os.getenv("TRANSCRIBE_WINDOW_SEC", "8.0"))
+KEYWORD_STREAM         = os.getenv("KEYWORD_STREAM", "audio:keywords")
 
 class SpeechTranscriptionService:
     def __init__(self):
-        # Redis client
-        self.redis = redis.Redis.from_url(REDIS_URL)
-        # Audio stream client
-        self.client = AudioClient()
+        # Ensure OpenAI key is set
+        self.api_key = os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            raise RuntimeError("Please set OPENAI_API_KEY in your environment")
 
-        # Audio format
-        self.sample_rate  = SAMPLE_RATE
-        self.channels     = CHANNELS
+        # Redis client
+        self.redis = get_redis()
+        # Audio stream client and format
+        if USE_RESAMPLED:
+            self.client       = AudioClient(stream=RESAMPLED_STREAM)
+            self.sample_rate  = FEATURE_RATE
+            self.channels     = 1
+        else:
+            self.client       = AudioClient()
+            self.sample_rate  = SAMPLE_RATE
+            self.channels     = CHANNELS
         self.sample_width = 2  # bytes per sample (int16)
 
         # Segment sizing
@@ -51,8 +59,15 @@ class SpeechTranscriptionService:
         self.buffer      = bytearray()
         self.buffer_lock = threading.Lock()
         self.segment_q   = []
+        # mono_ns of the first byte in self.buffer (None if unknown)
+        self.buffer_start_ns = None
+        self.bytes_per_sec   = self.sample_rate * self.sample_width * self.channels
+        # (start_ns, end_ns) of the speech to transcribe, opened by keywords
+        self.gate = None
 
         # Start background loops
+        if GATE_KEYWORDS:
+            threading.Thread(target=self._watch_keywords, daemon=True).start()
         threading.Thread(target=self._read_audio, daemon=True).start()
         threading.Thread(target=self._chunker,    daemon=True).start()
         threading.Thread(target=self._transcribe, daemon=True).start()
@@ -60,28 +75,84 @@ class SpeechTranscriptionService:
     def _read_audio(self):
         for msg in self.client.stream_chunks():
             pcm = msg["pcm_bytes"]
+            if "mono_ns" in msg:
+                # capture → received by the transcriber
+                metrics.observe("transcription.chunk_age", (mono_ns() - msg["mono_ns"]) / 1e6)
             with self.buffer_lock:
+                if not self.buffer:
+                    self.buffer_start_ns = msg.get("mono_ns")
                 self.buffer.extend(pcm)
 
+    def _watch_keywords(self):
+        # a concrete start ID: "$" would be re-resolved on every read and
+        # lose keywords published between two of them
+        last_id = None
+        backoff = Backoff()
+        while True:
+            try:
+                if last_id is None:
+                    last = self.redis.xrevrange(KEYWORD_STREAM, count=1)
+                    last_id = last[0][0] if last else "0-0"
+                resp = self.redis.xread({KEYWORD_STREAM: last_id}, block=5000)
+                backoff.reset()
+            except CONNECTION_ERRORS:
+                backoff.sleep("SpeechTranscriptionService")
+                continue
+            for _, entries in resp or []:
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    if "*" not in GATE_KEYWORDS and fields[b"keyword"].decode() not in GATE_KEYWORDS:
+                        continue
+                    start = int(fields[b"start_mono_ns"])
+                    until = int(fields[b"end_mono_ns"]) + int(GATE_WINDOW_SEC * 1e9)
+                    with self.buffer_lock:
+                        if self.gate is not None and start <= self.gate[1]:
+                            self.gate = (self.gate[0], max(self.gate[1], until))
+                        else:
+                            self.gate = (start, until)
+
+    def _gate_open(self, start_ns, length: int) -> bool:
+        """Whether a segment overlaps the speech following a keyword."""
+        if not GATE_KEYWORDS:
+            return True
+        with self.buffer_lock:
+            gate = self.gate
+        if gate is None or start_ns is None:
+            return False
+        end_ns = start_ns + length * 1_000_000_000 // self.bytes_per_sec
+        return end_ns >= gate[0] and start_ns <= gate[1]
+
     def _chunker(self):
         while True:
             with self.buffer_lock:
                 if len(self.buffer) >= self.segment_bytes:
                     seg = bytes(self.buffer[:self.segment_bytes])
+                    start_ns = self.buffer_start_ns
                     # retain overlap
-                    self.buffer = self.buffer[self.segment_bytes - self.overlap_bytes:]
-                    self.segment_q.append(seg)
+                    advance = self.segment_bytes - self.overlap_bytes
+                    self.buffer = self.buffer[advance:]
+                    if start_ns is not None:
+                        self.buffer_start_ns = start_ns + advance * 1_000_000_000 // self.bytes_per_sec
+                    self.segment_q.append((seg, start_ns))
             time.sleep(0.05)
 
     def _transcribe(self):
+        # openai takes a second or more to import on a Pi: do it here, while
+        # the first segment is still buffering, instead of at startup
+        import openai
+        openai.api_key = self.api_key
         while True:
             if not self.segment_q:
                 time.sleep(0.1)
                 continue
-            segment = self.segment_q.pop(0)
+            segment, start_ns = self.segment_q.pop(0)
+            if not self._gate_open(start_ns, len(segment)):
+                metrics.count("transcription.gated_segments")
+                continue
             arr = np.frombuffer(segment, dtype=np.int16)
             if np.max(np.abs(arr)) < SILENCE_THRESHOLD:
                 print("Silent...")
+                metrics.count("transcription.silent_segments")
                 continue
 
             # Write segment to temp WAV
@@ -96,7 +167,7 @@ class SpeechTranscriptionService:
 
             # Transcribe
             try:
-                with open(wav_path, "rb") as f:
+                with open(wav_path, "rb") as f, metrics.timer("transcription.api"):
                     resp = openai.audio.transcriptions.create(
                         model=MODEL_NAME,
                         file=f,
@@ -117,6 +188,14 @@ class SpeechTranscriptionService:
                 "timestamp":   datetime.utcnow().isoformat(),
                 "text":        text
             }
+            # capture-time span of the segment on the shared monotonic clock
+            if start_ns is not None:
+                result["start_mono_ns"] = start_ns
+                result["end_mono_ns"]   = start_ns + len(segment) * 1_000_000_000 // self.bytes_per_sec
+                # time from the end of speech to a published transcript
+                result["latency_ms"]    = round((mono_ns() - result["end_mono_ns"]) / 1e6, 1)
+                metrics.observe("transcription.latency", result["latency_ms"])
+            metrics.count("transcription.segments")
             # Publish and update latest
             self.redis.xadd(TRANSCRIPT_STREAM, result)
             self.redis.set(LATEST_KEY, json.dumps(result))
@@ -129,6 +208,10 @@ class SpeechTranscriptionService:
         except KeyboardInterrupt:
             print("Stopping SpeechTranscriptionService.")
 
-if __name__ == "__main__":
+def main():
     svc = SpeechTranscriptionService()
     svc.run()
+
+if __name__ == "__main__":
+    metrics.start("speech_transcription")
+    main()
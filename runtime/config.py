@@ -0,0 +1,32 @@
+# runtime/config.py
+#
+# Settings shared by every sensor, middleware and actuator.
+# Values come from the environment, after loading a .env file if present.
+
+import os
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    # the CSI camera service runs under the system python without dotenv
+    pass
+
+def _default_redis_url() -> str:
+    # older deployments configured the vision services with host/port only
+    host = os.getenv("VISION_REDIS_HOST", "localhost")
+    port = os.getenv("VISION_REDIS_PORT", "6379")
+    return f"redis://{host}:{port}/0"
+
+# Redis
+REDIS_URL              = os.getenv("REDIS_URL") or _default_redis_url()
+REDIS_SOCKET           = os.getenv("REDIS_SOCKET", "")          # unix socket path, preferred over TCP when set
+REDIS_DB               = int(os.getenv("REDIS_DB", "0"))         # only used with REDIS_SOCKET
+REDIS_MAX_CONNECTIONS  = int(os.getenv("REDIS_MAX_CONNECTIONS", "32"))
+REDIS_HEALTH_CHECK_SEC = int(os.getenv("REDIS_HEALTH_CHECK_SEC", "30"))
+REDIS_RETRIES          = int(os.getenv("REDIS_RETRIES", "5"))
+REDIS_TIMEOUT_SEC      = float(os.getenv("REDIS_TIMEOUT_SEC", "10"))  # connect timeout
+
+# Reconnect backoff for long-running loops (seconds)
+BACKOFF_BASE_SEC       = float(os.getenv("BACKOFF_BASE_SEC", "0.5"))
+BACKOFF_MAX_SEC        = float(os.getenv("BACKOFF_MAX_SEC", "30"))
@@ -0,0 +1,128 @@
+"""
+runtime/connections.py
+
+Process-wide pooled Redis clients.
+
+Every module used to open its own connection (some on every call). Instead,
+get_redis() / get_async_redis() hand out clients backed by a single
+connection pool per process, configured from runtime/config.py:
+- REDIS_SOCKET switches to a unix domain socket for lower on-host latency
+- idle connections are health-checked every REDIS_HEALTH_CHECK_SEC
+- commands are retried with exponential backoff when the connection drops
+
+Long-running loops (pub/sub listeners, blocking stream reads) should wrap
+their body with Backoff so they survive a Redis restart.
+"""
+
+import random
+import threading
+import time
+import logging
+
+import redis
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+
+from .config import (
+    REDIS_URL, REDIS_SOCKET, REDIS_DB, REDIS_MAX_CONNECTIONS,
+    REDIS_HEALTH_CHECK_SEC, REDIS_RETRIES, REDIS_TIMEOUT_SEC,
+    BACKOFF_BASE_SEC, BACKOFF_MAX_SEC,
+)
+
+# errors after which it is worth reconnecting and trying again
+CONNECTION_ERRORS = (redis.ConnectionError, redis.TimeoutError)
+
+_lock = threading.Lock()
+_pool = None
+_client = None
+_async_pool = None
+
+def _pool_kwargs(retry_cls, error_types) -> dict:
+    return {
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "health_check_interval": REDIS_HEALTH_CHECK_SEC,
+        "socket_connect_timeout": REDIS_TIMEOUT_SEC,
+        "socket_keepalive": not REDIS_SOCKET,
+        "retry": retry_cls(ExponentialBackoff(cap=BACKOFF_MAX_SEC, base=BACKOFF_BASE_SEC), REDIS_RETRIES),
+        "retry_on_error": list(error_types),
+    }
+
+def _make_pool():
+    kwargs = _pool_kwargs(Retry, CONNECTION_ERRORS)
+    if REDIS_SOCKET:
+        kwargs.pop("socket_keepalive")
+        return redis.BlockingConnectionPool(
+            connection_class=redis.UnixDomainSocketConnection,
+            path=REDIS_SOCKET, db=REDIS_DB, **kwargs
+        )
+    return redis.BlockingConnectionPool.from_url(REDIS_URL, **kwargs)
+
+def _make_async_pool():
+    import redis.asyncio as aioredis
+    from redis.asyncio.retry import Retry as AsyncRetry
+    kwargs = _pool_kwargs(AsyncRetry, CONNECTION_ERRORS)
+    if REDIS_SOCKET:
+        kwargs.pop("socket_keepalive")
+        return aioredis.BlockingConnectionPool(
+            connection_class=aioredis.UnixDomainSocketConnection,
+            path=REDIS_SOCKET, db=REDIS_DB, **kwargs
+        )
+    return aioredis.BlockingConnectionPool.from_url(REDIS_URL, **kwargs)
+
+def get_redis() -> redis.Redis:
+    """
+    The process-wide Redis client. Thread-safe; pub/sub and blocking reads
+    check out their own connection from the shared pool.
+    """
+    global _pool, _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _pool = _make_pool()
+                _client = redis.Redis(connection_pool=_pool)
+    return _client
+
+def get_async_redis():
+    """
+    A redis.asyncio client on the process-wide async pool.
+    asyncio connections belong to an event loop, so use this from a
+    single loop per process (the normal case for asyncio applications).
+    """
+    import redis.asyncio as aioredis
+    global _async_pool
+    if _async_pool is None:
+        with _lock:
+            if _async_pool is None:
+                _async_pool = _make_async_pool()
+    return aioredis.Redis(connection_pool=_async_pool)
+
+class Backoff:
+    """
+    Exponential backoff with jitter for reconnect loops.
+
+        backoff = Backoff()
+        while True:
+            try:
+                ...            # long-running Redis work
+                backoff.reset()
+            except CONNECTION_ERRORS:
+                backoff.sleep()
+    """
+
+    def __init__(self, base: float = BACKOFF_BASE_SEC, cap: float = BACKOFF_MAX_SEC):
+        self.base = base
+        self.cap = cap
+        self.attempts = 0
+
+    def reset(self):
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        delay = min(self.cap, self.base * (2 ** self.attempts))
+        self.attempts += 1
+        return random.uniform(delay / 2, delay)
+
+    def sleep(self, name: str = "redis"):
+        delay = self.next_delay()
+        logging.warning("[%s] connection lost, retrying in %.1fs", name, delay)
+        time.sleep(delay)
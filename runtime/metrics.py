@@ -0,0 +1,352 @@
+"""
+runtime/metrics.py
+
+Lightweight hot-path instrumentation shared by all services.
+
+    from runtime import metrics
+
+    with metrics.timer("face.encodings"):
+        ...
+
+    @metrics.timer("face.search")
+    def find_similar_faces(...):
+        ...
+
+    metrics.count("camera.frames")
+    metrics.start("camera")   # once, in the service entry point
+
+Timers record milliseconds into fixed-bucket histograms; recording costs two
+perf_counter() calls and a bisect, so it can stay on in production.
+Metrics are recorded per process; start() names the process and launches a
+background thread that:
+- exports everything to the Redis hash metrics:<service> every few seconds
+  (status/server.py renders these as JSON and Prometheus text)
+- listens on the metrics:profile channel for on-demand sampling-profiler
+  requests and stores the collapsed stacks in metrics:profile:<service>
+
+Standard library and redis only: the CSI camera service uses it under the
+system python.
+"""
+
+import os
+import sys
+import json
+import time
+import bisect
+import logging
+import threading
+import functools
+from collections import Counter as _Tally
+
+from .connections import get_redis, Backoff, CONNECTION_ERRORS
+
+EXPORT_SEC      = float(os.getenv("METRICS_EXPORT_SEC", "5"))
+KEY_PREFIX      = "metrics:"
+SERVICES_KEY    = "metrics:services"
+PROFILE_CHANNEL = "metrics:profile"
+PROFILE_PREFIX  = "metrics:profile:"
+PROFILE_MAX_SEC = 120
+
+# histogram bucket upper bounds, milliseconds
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def quantile(counts, q: float):
+    """
+    Estimate the q-th quantile from histogram bucket counts, interpolating
+    linearly inside the bucket (as Prometheus' histogram_quantile does).
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    lower = 0.0
+    for bound, n in zip(BUCKETS_MS + (float("inf"),), counts):
+        if n and seen + n >= rank:
+            if bound == float("inf"):
+                return lower  # open-ended bucket: best we can say
+            return round(lower + (bound - lower) * (rank - seen) / n, 3)
+        seen += n
+        lower = bound
+    return lower
+
+
+class Histogram:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(BUCKETS_MS) + 1)  # last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.last = None
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(BUCKETS_MS, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+            self.last = value
+
+    def quantile(self, q: float):
+        return quantile(self.counts, q)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.last = None
+
+    def export(self) -> dict:
+        with self._lock:
+            return {
+                "type": "histogram",
+                "counts": list(self.counts),
+                "sum": self.sum,
+                "count": self.count,
+                "last": self.last,
+                "p50": self.quantile(0.5),
+                "p95": self.quantile(0.95),
+            }
+
+
+class Counter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, n: int = 1):
+        with self._lock:
+            self.value += n
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def export(self) -> dict:
+        return {"type": "counter", "value": self.value}
+
+
+class Gauge:
+    def __init__(self):
+        self.value = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def _reset(self):
+        self.value = None
+
+    def export(self) -> dict:
+        return {"type": "gauge", "value": self.value}
+
+
+class Registry:
+    def __init__(self):
+        self.service = None
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get(self, name: str, cls):
+        m = self._metrics.get(name)
+        if m is None:
+            with self._lock:
+                m = self._metrics.setdefault(name, cls())
+        return m
+
+    def histogram(self, name: str) -> Histogram:
+        return self._get(name, Histogram)
+
+    def counter(self, name: str) -> Counter:
+        return self._get(name, Counter)
+
+    def gauge(self, name: str) -> Gauge:
+        return self._get(name, Gauge)
+
+    def export(self) -> dict:
+        with self._lock:
+            items = list(self._metrics.items())
+        return {name: m.export() for name, m in items}
+
+    def _after_fork(self):
+        # a forked worker (runtime/supervisor.py) starts with empty metrics and
+        # no exporter; timers keep their histogram objects, so reset in place.
+        # Locks are replaced: another thread may have held one at fork time.
+        self.service = None
+        self._lock = threading.Lock()
+        for m in self._metrics.values():
+            m._reset()
+
+
+REGISTRY = Registry()
+os.register_at_fork(after_in_child=REGISTRY._after_fork)
+
+
+class timer:
+    """
+    Time a block or a function into the histogram `name` (milliseconds).
+    Use as a context manager or as a decorator.
+    """
+
+    __slots__ = ("hist", "t0")
+
+    def __init__(self, name: str):
+        self.hist = REGISTRY.histogram(name)
+        self.t0 = None
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe((time.perf_counter() - self.t0) * 1000)
+        return False
+
+    def __call__(self, fn):
+        hist = self.hist
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.observe((time.perf_counter() - t0) * 1000)
+        return wrapper
+
+
+def count(name: str, n: int = 1):
+    REGISTRY.counter(name).inc(n)
+
+def observe(name: str, value_ms: float):
+    REGISTRY.histogram(name).observe(value_ms)
+
+def gauge(name: str, value: float):
+    REGISTRY.gauge(name).set(value)
+
+
+# ——— sampling profiler ———
+
+def sample_stacks(seconds: float, hz: float = 100.0) -> str:
+    """
+    Sample every thread's stack for `seconds` and return collapsed stacks
+    ("frame;frame;frame count" per line, flamegraph.pl compatible).
+    """
+    me = threading.get_ident()
+    tally = _Tally()
+    names = {}  # code object -> "file.py:function"
+    interval = 1.0 / hz
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            # walk the frames directly: traceback.extract_stack() would read
+            # every source line, in the sampled service's time
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                name = names.get(code)
+                if name is None:
+                    name = names[code] = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+                stack.append(name)
+                frame = frame.f_back
+            tally[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return "\n".join(f"{stack} {n}" for stack, n in tally.most_common())
+
+
+def _profile(r, request: dict):
+    seconds = min(float(request.get("seconds", 10)), PROFILE_MAX_SEC)
+    hz = float(request.get("hz", 100))
+    logging.info("[metrics] profiling %s for %.0fs", REGISTRY.service, seconds)
+    stacks = sample_stacks(seconds, hz)
+    r.set(PROFILE_PREFIX + REGISTRY.service, stacks, ex=24 * 3600)
+
+
+def _profile_listener():
+    r = get_redis()
+    backoff = Backoff()
+    while True:
+        try:
+            pubsub = r.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(PROFILE_CHANNEL)
+            for msg in pubsub.listen():
+                backoff.reset()
+                try:
+                    request = json.loads(msg["data"])
+                except Exception:
+                    continue
+                if request.get("service") in (REGISTRY.service, "*"):
+                    threading.Thread(target=_profile, args=(r, request), daemon=True).start()
+        except CONNECTION_ERRORS:
+            backoff.sleep("metrics")
+
+
+def _exporter(interval: float):
+    r = get_redis()
+    key = KEY_PREFIX + REGISTRY.service
+    while True:
+        time.sleep(interval)
+        data = REGISTRY.export()
+        if not data:
+            continue
+        try:
+            pipe = r.pipeline(transaction=False)
+            pipe.hset(key, mapping={name: json.dumps(m) for name, m in data.items()})
+            pipe.expire(key, int(interval * 3) + 1)
+            pipe.sadd(SERVICES_KEY, REGISTRY.service)
+            pipe.execute()
+        except CONNECTION_ERRORS:
+            continue
+
+
+def start(service: str, interval: float = EXPORT_SEC):
+    """
+    Name this process's metrics and start exporting them. Call once from the
+    service entry point; libraries only record.
+    """
+    if REGISTRY.service is not None:
+        return
+    REGISTRY.service = service
+    threading.Thread(target=_exporter, args=(interval,), daemon=True).start()
+    threading.Thread(target=_profile_listener, daemon=True).start()
+
+
+# ——— Prometheus text format ———
+
+def _prom_name(name: str) -> str:
+    return "chakna_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def prometheus_text(services: dict) -> str:
+    """
+    Render exported metrics as Prometheus text.
+    Args:
+        services: {service: {metric name: exported dict}}
+    """
+    families = {}
+    for service, data in services.items():
+        for name, m in data.items():
+            families.setdefault(name, []).append((service, m))
+
+    lines = []
+    for name, members in sorted(families.items()):
+        kind = members[0][1]["type"]
+        base = _prom_name(name) + ("_ms" if kind == "histogram" else "")
+        if kind == "counter":
+            base += "_total"
+        lines.append(f"# TYPE {base} {kind}")
+        for service, m in sorted(members, key=lambda x: x[0]):
+            label = f'service="{service}"'
+            if kind == "histogram":
+                cumulative = 0
+                for bound, n in zip(BUCKETS_MS + ("+Inf",), m["counts"]):
+                    cumulative += n
+                    lines.append(f'{base}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f"{base}_sum{{{label}}} {m['sum']}")
+                lines.append(f"{base}_count{{{label}}} {m['count']}")
+            elif m["value"] is not None:
+                lines.append(f"{base}{{{label}}} {m['value']}")
+    return "\n".join(lines) + "\n"
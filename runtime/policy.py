@@ -0,0 +1,74 @@
+"""
+runtime/policy.py
+
+How long each Redis stream is kept, shared by the retention service
+(runtime/retention.py) and the services producing the streams.
+
+Budgets per stream:
+    seconds   keep this much data ("5 minutes of mic audio")
+    max_mb    keep at most this much memory, by dropping the oldest span
+    archive   write expiring entries to RETENTION_ARCHIVE_DIR first
+
+They can be overridden with a JSON object in RETENTION_POLICY, e.g.
+    RETENTION_POLICY='{"audio:pcm:stream": {"seconds": 60}}'
+Set it in .env, so every service sees the same policy.
+
+The retention service trims by time. Producers must not trim by entry count
+below that, or a stream is cut short of its policy; instead they pass
+producer_maxlen() as MAXLEN, a backstop well above what the policy keeps
+that only matters when the retention service isn't running.
+"""
+
+import os
+import json
+import logging
+
+from runtime import config  # noqa: F401  (loads .env)
+from sensors.audio.config import STREAM_NAME as AUDIO_STREAM, RESAMPLED_STREAM, LEVELS_STREAM, MEL_STREAM
+from sensors.vision.config import HISTORY_STREAM
+
+MAXLEN_MARGIN = 2.0  # producer_maxlen() over the entries the policy keeps
+
+DEFAULT_POLICY = {
+    AUDIO_STREAM:           {"seconds": 300, "max_mb": 64},
+    RESAMPLED_STREAM:       {"seconds": 300},
+    LEVELS_STREAM:          {"seconds": 3600},
+    MEL_STREAM:             {"seconds": 300},
+    "audio:stream":         {"seconds": 60},
+    "audio:transcriptions": {"seconds": 7 * 24 * 3600, "archive": True},
+    "audio:keywords":       {"seconds": 7 * 24 * 3600, "archive": True},
+    "vision:faces":         {"seconds": 24 * 3600, "archive": True},
+    "fusion:events":        {"seconds": 24 * 3600},
+    HISTORY_STREAM:         {"seconds": 3600, "max_mb": 256},
+}
+
+def load_policy() -> dict:
+    """
+    DEFAULT_POLICY, with the per-stream overrides from RETENTION_POLICY.
+    A malformed RETENTION_POLICY is logged and ignored.
+    """
+    policy = {stream: dict(p) for stream, p in DEFAULT_POLICY.items()}
+    try:
+        overrides = json.loads(os.getenv("RETENTION_POLICY", "{}"))
+        if not isinstance(overrides, dict) or not all(isinstance(p, dict) for p in overrides.values()):
+            raise ValueError("expected {stream: {budget: value}}")
+    except ValueError as e:
+        logging.warning("Ignoring RETENTION_POLICY: %s", e)
+        return policy
+    for stream, p in overrides.items():
+        policy.setdefault(stream, {}).update(p)
+    return policy
+
+POLICY = load_policy()
+
+def producer_maxlen(stream: str, per_sec: float):
+    """
+    MAXLEN for a producer adding at most `per_sec` entries a second to `stream`.
+    Returns:
+        MAXLEN_MARGIN times the entries its time budget keeps, or None (no
+        cap) if the stream has no time budget
+    """
+    seconds = POLICY.get(stream, {}).get("seconds")
+    if not seconds:
+        return None
+    return int(seconds * per_sec * MAXLEN_MARGIN) + 1
@@ -0,0 +1,251 @@
+"""
+runtime/retention.py
+
+Keeps the Redis streams within time and memory budgets.
+
+Every RETENTION_INTERVAL_SEC the retention service, for each stream in its
+policy:
+- computes a cutoff time from the stream's budgets (see runtime/policy.py)
+  and, when Redis as a whole uses more than REDIS_MEMORY_BUDGET_MB, shrinks
+  every stream's span proportionally (at most by half per pass)
+- with RETENTION_ARCHIVE_DIR set and `archive` in the policy, appends the
+  expiring entries to gzipped JSON lines under that directory, one file per
+  stream and day (<stream>/<YYYYMMDD>.jsonl.gz)
+- trims with XTRIM MINID: stream IDs start with the insertion time in ms, so
+  retention is expressed in time rather than entry counts (Redis 6.2+)
+
+Current usage (length, memory, age of the oldest entry, budgets) is stored
+as JSON in retention:usage for status/server.py, and printed by --report.
+
+    uv run -m runtime.retention
+    uv run -m runtime.retention --report
+
+"""
+
+import os
+import json
+import gzip
+import time
+import base64
+import logging
+import argparse
+
+from runtime import metrics
+from runtime.connections import get_redis, Backoff, CONNECTION_ERRORS
+from runtime.policy import load_policy
+
+INTERVAL_SEC     = float(os.getenv("RETENTION_INTERVAL_SEC", "30"))
+MEMORY_BUDGET_MB = float(os.getenv("REDIS_MEMORY_BUDGET_MB", "0"))   # whole Redis; 0 disables
+ARCHIVE_DIR      = os.getenv("RETENTION_ARCHIVE_DIR", "")             # empty disables archiving
+USAGE_KEY        = "retention:usage"
+ARCHIVED_PREFIX  = "retention:archived:"  # + stream: last archived entry ID
+
+def _id_ms(entry_id) -> int:
+    if isinstance(entry_id, bytes):
+        entry_id = entry_id.decode()
+    return int(entry_id.split("-")[0])
+
+def _encode(entry_id: bytes, fields: dict) -> dict:
+    # text fields are kept readable, binary ones (PCM, JPEG) base64-encoded
+    out = {"id": entry_id.decode()}
+    for k, v in fields.items():
+        try:
+            out[k.decode()] = v.decode()
+        except UnicodeDecodeError:
+            out[k.decode() + ":b64"] = base64.b64encode(v).decode()
+    return out
+
+class RetentionManager:
+    def __init__(
+        self,
+        policy: dict = None,
+        memory_budget_mb: float = MEMORY_BUDGET_MB,
+        archive_dir: str = ARCHIVE_DIR,
+        redis_client=None
+    ):
+        """
+        Args:
+            policy: {stream: {"seconds", "max_mb", "archive"}}, defaults to load_policy()
+            memory_budget_mb: Redis used_memory above which streams are shrunk, 0 for none
+            archive_dir: where expiring entries of `archive` streams are written
+            redis_client: defaults to the process-wide pooled client
+        """
+        self.policy = policy if policy is not None else load_policy()
+        self.memory_budget = int(memory_budget_mb * 2**20)
+        self.archive_dir = archive_dir
+        self.redis = redis_client or get_redis()
+
+    def _now_ms(self) -> int:
+        # entry IDs come from the Redis server clock, so compare against it
+        sec, usec = self.redis.time()
+        return sec * 1000 + usec // 1000
+
+    def _stats(self) -> dict:
+        stats = {}
+        for stream in self.policy:
+            if not self.redis.exists(stream):
+                continue
+            info = self.redis.xinfo_stream(stream)
+            s = {
+                "length": info["length"],
+                "memory_bytes": self.redis.memory_usage(stream, samples=5) or 0,
+                "first_ms": None,
+                "last_ms": None,
+            }
+            if info["length"]:
+                s["first_ms"] = _id_ms(info["first-entry"][0])
+                s["last_ms"] = _id_ms(info["last-entry"][0])
+            stats[stream] = s
+        return stats
+
+    @staticmethod
+    def _keep(s: dict, fraction: float) -> int:
+        """Cutoff that keeps the newest `fraction` of the stream's time span."""
+        return s["last_ms"] - int((s["last_ms"] - s["first_ms"]) * fraction)
+
+    def _cutoffs(self, stats: dict, now_ms: int, used_memory: int) -> dict:
+        cutoffs = {}
+        for stream, s in stats.items():
+            if not s["length"]:
+                continue
+            p = self.policy[stream]
+            cutoff = 0
+            if p.get("seconds"):
+                cutoff = now_ms - int(p["seconds"] * 1000)
+            max_bytes = p.get("max_mb", 0) * 2**20
+            if max_bytes and s["memory_bytes"] > max_bytes:
+                cutoff = max(cutoff, self._keep(s, max_bytes / s["memory_bytes"]))
+            cutoffs[stream] = cutoff
+
+        if self.memory_budget and used_memory > self.memory_budget:
+            total = sum(s["memory_bytes"] for s in stats.values())
+            if total:
+                # shrink every stream by the same share of its span; gradually,
+                # since the freed memory only shows up in used_memory afterwards
+                keep = max(1 - (used_memory - self.memory_budget) / total, 0.5)
+                logging.warning("Redis uses %d MB, over the %d MB budget: keeping %.0f%% of every stream",
+                                used_memory >> 20, self.memory_budget >> 20, keep * 100)
+                for stream in cutoffs:
+                    cutoffs[stream] = max(cutoffs[stream], self._keep(stats[stream], keep))
+        return cutoffs
+
+    def _archive(self, stream: str, cutoff_ms: int, batch: int = 500) -> int:
+        """
+        Append the entries older than cutoff_ms that were not archived yet,
+        to one file per day of the entries' time.
+        """
+        progress = ARCHIVED_PREFIX + stream
+        last = self.redis.get(progress)
+        lo = "(" + last.decode() if last else "-"
+        hi = str(cutoff_ms - 1)  # completes to <cutoff-1>-<max>: everything MINID would drop
+        folder = os.path.join(self.archive_dir, stream.replace(":", "_"))
+        archived = 0
+        day, f = None, None
+        try:
+            while True:
+                entries = self.redis.xrange(stream, min=lo, max=hi, count=batch)
+                if not entries:
+                    break
+                for entry_id, fields in entries:
+                    entry_day = time.strftime("%Y%m%d", time.localtime(_id_ms(entry_id) / 1000))
+                    if entry_day != day:
+                        if f is not None:
+                            f.close()
+                        os.makedirs(folder, exist_ok=True)
+                        # appending adds a gzip member; readers see one stream
+                        f = gzip.open(os.path.join(folder, entry_day + ".jsonl.gz"), "at")
+                        day = entry_day
+                    f.write(json.dumps(_encode(entry_id, fields)) + "\n")
+                archived += len(entries)
+                lo = "(" + entries[-1][0].decode()
+                if len(entries) < batch:
+                    break
+        finally:
+            if f is not None:
+                f.close()
+        if archived:
+            self.redis.set(progress, lo[1:])
+        return archived
+
+    def enforce(self) -> dict:
+        """One retention pass. Returns the usage report."""
+        used_memory = self.redis.info("memory")["used_memory"]
+        stats = self._stats()
+        done = {}
+        for stream, cutoff in self._cutoffs(stats, self._now_ms(), used_memory).items():
+            if cutoff <= stats[stream]["first_ms"]:
+                continue
+            archived = 0
+            if self.archive_dir and self.policy[stream].get("archive"):
+                archived = self._archive(stream, cutoff)
+                metrics.count("retention.archived", archived)
+            trimmed = self.redis.xtrim(stream, minid=cutoff, approximate=True)
+            metrics.count("retention.trimmed", trimmed)
+            done[stream] = {"trimmed": trimmed, "archived": archived}
+        report = self.report()
+        for stream, d in done.items():
+            report["streams"][stream].update(d)
+        self.redis.set(USAGE_KEY, json.dumps(report), ex=int(INTERVAL_SEC * 3) + 1)
+        return report
+
+    def report(self) -> dict:
+        """Current usage of every stream in the policy, against its budgets."""
+        now_ms = self._now_ms()
+        streams = {}
+        for stream, s in self._stats().items():
+            p = self.policy[stream]
+            streams[stream] = {
+                "length": s["length"],
+                "memory_bytes": s["memory_bytes"],
+                "oldest_sec": round((now_ms - s["first_ms"]) / 1000, 1) if s["first_ms"] else None,
+                "retention_sec": p.get("seconds"),
+                "max_bytes": int(p["max_mb"] * 2**20) if p.get("max_mb") else None,
+                "archive": bool(self.archive_dir and p.get("archive")),
+            }
+        return {
+            "timestamp": time.time(),
+            "redis_used_bytes": self.redis.info("memory")["used_memory"],
+            "budget_bytes": self.memory_budget or None,
+            "streams": streams,
+        }
+
+    def run(self, interval: float = INTERVAL_SEC):
+        logging.info("Retention for %s, every %.0fs", ", ".join(self.policy), interval)
+        backoff = Backoff()
+        while True:
+            try:
+                self.enforce()
+                backoff.reset()
+            except CONNECTION_ERRORS:
+                backoff.sleep("RetentionManager")
+                continue
+            time.sleep(interval)
+
+def print_report(report: dict):
+    budget = report["budget_bytes"]
+    print(f"Redis memory {report['redis_used_bytes'] / 2**20:.1f} MB"
+          + (f" of {budget / 2**20:.0f} MB budget" if budget else ""))
+    for name, s in report["streams"].items():
+        oldest = "–" if s["oldest_sec"] is None else f"{s['oldest_sec']:.0f}s"
+        keep = "–" if not s["retention_sec"] else f"{s['retention_sec']:.0f}s"
+        print(f"  {name:28s} {s['length']:8d} entries {s['memory_bytes'] / 2**20:8.1f} MB  "
+              f"oldest {oldest:>8s} / keep {keep}")
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Redis stream retention and memory budgets")
+    parser.add_argument("--report", action="store_true", help="print current usage and exit, without trimming")
+    parser.add_argument("--once", action="store_true", help="run a single retention pass and print the result")
+    args = parser.parse_args()
+
+    manager = RetentionManager()
+    if args.report:
+        print_report(manager.report())
+    elif args.once:
+        print_report(manager.enforce())
+    else:
+        manager.run()
+
+if __name__ == "__main__":
+    metrics.start("retention")
+    main()
@@ -0,0 +1,288 @@
+"""
+runtime/supervisor.py
+
+Runs several pipeline components in one supervised process tree, instead of
+one systemd unit and one interpreter each.
+
+    uv run -m runtime.supervisor camera audio_capture speaker faces audio_features fusion:thread retention:thread
+
+Each worker runs either
+- forked (default): a fork server, a single-threaded interpreter started
+  next to the supervisor, imports the worker modules and their heavy
+  libraries and models once (cv2, numpy, the dlib face models, openai), and
+  forks every (re)start from there. The children share those pages
+  copy-on-write, and start without paying for the imports again. The
+  supervisor itself runs threads (metrics, thread workers), and a fork from
+  a multithreaded process can copy a lock some other thread holds.
+- as a thread (`name:thread`) inside the supervisor: cheapest, for I/O-bound
+  workers. CPU-heavy ones (faces) would hold the GIL against the others.
+  A thread can't be stopped from outside: when a worker's main() ends, any
+  threads it started keep running next to its restart. Workers that start
+  threads of their own (speaker, transcription) are only run forked.
+
+A worker that exits or raises is restarted with exponential backoff (reset
+once it has stayed up for STABLE_SEC). Worker health (state, pid, restarts,
+last exit, memory) is written to the supervisor:workers hash every few
+seconds and shown by status/server.py.
+
+The CSI camera needs the system python (picamera2) and can't be supervised;
+keep its systemd unit.
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import argparse
+import importlib
+import importlib.util
+import threading
+import traceback
+import multiprocessing
+import multiprocessing.forkserver
+
+from runtime import metrics
+from runtime.connections import get_redis, Backoff, CONNECTION_ERRORS
+
+WORKERS_KEY  = "supervisor:workers"
+REPORT_SEC   = float(os.getenv("SUPERVISOR_REPORT_SEC", "2.0"))
+STABLE_SEC   = float(os.getenv("SUPERVISOR_STABLE_SEC", "60"))   # uptime after which backoff resets
+
+# name -> module with a main(), metrics service name, modules to import in
+# the fork server, and whether main() starts threads of its own
+WORKERS = {
+    "camera":           {"module": "sensors.vision.camera_service_usb",        "service": "camera",
+                         "preload": ["numpy", "cv2"]},
+    "audio_capture":    {"module": "sensors.audio.audio_service",              "service": "audio_capture",
+                         "preload": ["numpy"]},
+    "speaker":          {"module": "actuators.audio.speaker_service",          "service": "speaker",
+                         "threads": True},
+    "faces":            {"module": "middlewares.face_recognition.middleware",  "service": "face_middleware",
+                         "preload": ["numpy", "cv2", "face_recognition"]},
+    "transcription":    {"module": "middlewares.speech_transcription",         "service": "speech_transcription",
+                         "preload": ["numpy", "openai"], "threads": True},
+    "audio_features":   {"module": "middlewares.audio_features",               "service": "audio_features",
+                         "preload": ["numpy"]},
+    "keyword_spotting": {"module": "middlewares.keyword_spotting",             "service": "keyword_spotting",
+                         "preload": ["numpy"]},
+    "fusion":           {"module": "middlewares.fusion",                       "service": "fusion",
+                         "preload": ["numpy"]},
+    "retention":        {"module": "runtime.retention",                        "service": "retention"},
+}
+
+# PortAudio and ALSA are deliberately not preloaded: their handles must not
+# be shared across fork.
+
+FORKSERVER = multiprocessing.get_context("forkserver")
+
+# freeze the heap before every fork (in the fork server), so the collector
+# doesn't write to (and copy) the pages a child shares with its parent
+os.register_at_fork(before=gc.freeze)
+
+
+def memory(pid: int) -> dict:
+    """RSS and PSS (shared pages split between processes) of a process, in bytes."""
+    out = {"rss_bytes": None, "pss_bytes": None}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                if key in ("Rss", "Pss"):
+                    out[f"{key.lower()}_bytes"] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return out
+
+
+def _run_forked(name: str, spec: dict):
+    # child of the fork server, which configured neither logging nor metrics
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    metrics.start(spec["service"])
+    importlib.import_module(spec["module"]).main()
+
+
+class Worker:
+    def __init__(self, name: str, mode: str):
+        self.name = name
+        self.mode = mode
+        self.spec = WORKERS[name]
+        self.backoff = Backoff()
+        self.handle = None        # multiprocessing.Process or threading.Thread
+        self.started_at = None
+        self.restart_at = 0.0
+        self.restarts = 0
+        self.last_exit = None
+        self.error = None         # thread workers: last exception
+
+    def start(self):
+        if self.mode == "fork":
+            self.handle = FORKSERVER.Process(target=_run_forked, args=(self.name, self.spec), name=self.name)
+        else:
+            self.handle = threading.Thread(target=self._run_thread, name=self.name, daemon=True)
+        self.handle.start()
+        self.started_at = time.monotonic()
+        logging.info("[supervisor] started %s (%s%s)", self.name, self.mode,
+                     f", pid {self.handle.pid}" if self.mode == "fork" else "")
+
+    def _run_thread(self):
+        try:
+            importlib.import_module(self.spec["module"]).main()
+            self.error = "returned"
+        except BaseException as e:
+            self.error = f"{type(e).__name__}: {e}"
+            logging.error("[supervisor] %s crashed:\n%s", self.name, traceback.format_exc())
+
+    def alive(self) -> bool:
+        return self.handle is not None and self.handle.is_alive()
+
+    def check(self, now: float):
+        """Notice an exit and schedule (or perform) the restart."""
+        if self.handle is None:
+            if now >= self.restart_at:
+                self.start()
+            return
+        if self.alive():
+            return
+        uptime = now - self.started_at
+        self.last_exit = f"exit code {self.handle.exitcode}" if self.mode == "fork" else self.error
+        if uptime >= STABLE_SEC:
+            self.backoff.reset()
+        delay = self.backoff.next_delay()
+        logging.warning("[supervisor] %s stopped after %.0fs (%s), restarting in %.1fs",
+                        self.name, uptime, self.last_exit, delay)
+        self.handle = None
+        self.restarts += 1
+        self.restart_at = now + delay
+        metrics.count("supervisor.restarts")
+
+    def stop(self, timeout: float = 5.0):
+        if self.mode == "fork" and self.alive():
+            self.handle.terminate()
+            self.handle.join(timeout)
+            if self.handle.is_alive():
+                self.handle.kill()
+        # threads are daemons and end with the supervisor
+
+    def health(self, now: float) -> dict:
+        alive = self.alive()
+        h = {
+            "mode": self.mode,
+            "state": "running" if alive else "restarting",
+            "pid": (self.handle.pid if self.mode == "fork" else os.getpid()) if alive else None,
+            "uptime_sec": round(now - self.started_at, 1) if alive else None,
+            "restarts": self.restarts,
+            "last_exit": self.last_exit,
+            "rss_bytes": None,
+            "pss_bytes": None,
+        }
+        if alive and self.mode == "fork":
+            h.update(memory(self.handle.pid))
+        return h
+
+
+class Supervisor:
+    def __init__(self, workers):
+        """
+        Args:
+            workers: [(name, "fork" | "thread")]
+        """
+        self.workers = [Worker(name, mode) for name, mode in workers]
+        self.stopping = False
+
+    def _preload(self):
+        """Import the thread workers here, and have the fork server import the forked ones."""
+        modules = ["runtime.supervisor"]  # registers the gc.freeze() hook there
+        for w in self.workers:
+            if w.mode == "thread":
+                importlib.import_module(w.spec["module"])
+                continue
+            for module in [*w.spec.get("preload", []), w.spec["module"]]:
+                # the fork server skips modules it can't import, silently
+                if importlib.util.find_spec(module) is None:
+                    logging.warning("[supervisor] can't preload %s: not installed", module)
+                elif module not in modules:
+                    modules.append(module)
+        if len(modules) > 1:
+            FORKSERVER.set_forkserver_preload(modules)
+            # start it now, rather than on the first fork
+            multiprocessing.forkserver.ensure_running()
+
+    def _report(self, r):
+        now = time.monotonic()
+        health = {w.name: w.health(now) for w in self.workers}
+        health["supervisor"] = {"mode": "supervisor", "state": "running", "pid": os.getpid(),
+                                "restarts": 0, **memory(os.getpid())}
+        try:
+            pipe = r.pipeline(transaction=False)
+            pipe.delete(WORKERS_KEY)
+            pipe.hset(WORKERS_KEY, mapping={name: json.dumps(h) for name, h in health.items()})
+            pipe.expire(WORKERS_KEY, int(REPORT_SEC * 3) + 1)
+            pipe.execute()
+        except CONNECTION_ERRORS:
+            pass
+
+    def _shutdown(self, signum, frame):
+        self.stopping = True
+
+    def run(self):
+        self._preload()
+        # thread workers record into the supervisor's registry: name it before
+        # any of them runs
+        if any(w.mode == "thread" for w in self.workers):
+            metrics.start("supervisor")
+        for w in self.workers:
+            w.start()
+
+        signal.signal(signal.SIGTERM, self._shutdown)
+        signal.signal(signal.SIGINT, self._shutdown)
+        r = get_redis()
+        next_report = 0.0
+        try:
+            while not self.stopping:
+                now = time.monotonic()
+                for w in self.workers:
+                    w.check(now)
+                if now >= next_report:
+                    self._report(r)
+                    next_report = now + REPORT_SEC
+                time.sleep(0.2)
+        finally:
+            logging.info("[supervisor] stopping")
+            for w in self.workers:
+                w.stop()
+            try:
+                r.delete(WORKERS_KEY)
+            except CONNECTION_ERRORS:
+                pass
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Run pipeline components as supervised workers")
+    parser.add_argument("workers", nargs="+", metavar="WORKER[:MODE]",
+                        help="from: " + ", ".join(WORKERS) + "; MODE is fork or thread")
+    parser.add_argument("--mode", choices=("fork", "thread"), default="fork",
+                        help="default mode for workers without one")
+    args = parser.parse_args()
+
+    workers = []
+    for item in args.workers:
+        name, _, mode = item.partition(":")
+        if name not in WORKERS:
+            parser.error(f"unknown worker {name!r}")
+        if mode and mode not in ("fork", "thread"):
+            parser.error(f"unknown mode {mode!r} for {name}")
+        mode = mode or args.mode
+        if mode == "thread" and WORKERS[name].get("threads"):
+            parser.error(f"{name} starts threads of its own and can only run forked")
+        workers.append((name, mode))
+    # workers parse their own (empty) command line
+    sys.argv = sys.argv[:1]
+    Supervisor(workers).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# sensors/audio/async_client.py
+
+import redis.asyncio as aioredis
+from typing import AsyncIterator, Dict
+
+from runtime.connections import get_async_redis
+from .client import _parse_entry
+from .config import STREAM_NAME
+
+class AsyncAudioClient:
+    """
+    asyncio counterpart of AudioClient. By default it uses the process-wide
+    async pool from runtime.connections.
+    """
+
+    def __init__(self, redis: aioredis.Redis = None, stream: str = STREAM_NAME):
+        self.redis = redis or get_async_redis()
+        self.stream = stream
+
+    async def stream_chunks(self, block_ms: int = 5000) -> AsyncIterator[Dict]:
+        """
+        Yield new audio chunks as they arrive.
+        Same chunk format as AudioClient.stream_chunks().
+        """
+        last_id = "$"
+        while True:
+            resp = await self.redis.xread({self.stream: last_id}, block=block_ms, count=16)
+            if not resp:
+                continue
+            _, entries = resp[0]
+            for entry_id, fields in entries:
+                last_id = entry_id
+                yield _parse_entry(entry_id, fields)
+
+    def __aiter__(self):
+        return self.stream_chunks()
+
+    async def get_history(self, start_id: str = "-", end_id: str = "+", batch: int = 500) -> AsyncIterator[Dict]:
+        """
+        Replay already-captured audio between two entry IDs.
+        Defaults to entire history, fetched `batch` entries at a time.
+        """
+        lo = start_id
+        while True:
+            entries = await self.redis.xrange(self.stream, min=lo, max=end_id, count=batch)
+            for entry_id, fields in entries:
+                yield _parse_entry(entry_id, fields)
+            if len(entries) < batch:
+                return
+            lo = "(" + entries[-1][0].decode()
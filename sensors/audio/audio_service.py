@@ -3,46 +3,74 @@
 import time
 import base64
 import threading
-import sounddevice as sd
-import redis
 from datetime import datetime
 
-from .config import REDIS_URL, STREAM_NAME, SAMPLE_RATE, CHANNELS, CHUNK_SIZE
+from runtime import metrics
+from runtime.connections import get_redis
+from runtime.policy import producer_maxlen
+from .config import STREAM_NAME, SAMPLE_RATE, CHANNELS, CHUNK_SIZE
+from sensors.clock import Sequence, mono_ns
+
+# one entry per captured chunk
+STREAM_MAXLEN = producer_maxlen(STREAM_NAME, SAMPLE_RATE / CHUNK_SIZE)
 
 class AudioCaptureService:
     def __init__(self):
-        self.redis = redis.Redis.from_url(REDIS_URL)
+        self.redis = get_redis()
         self.stream = None
+        # index of the next captured sample, shared time base for consumers
+        self.samples = Sequence()
 
+    @metrics.timer("audio.callback")
     def _audio_callback(self, indata, frames, time_info, status):
         """
         sounddevice callback: gets called with each chunk
         """
         if status:
             print(f"[AudioCapture] Status: {status}", flush=True)
+            metrics.count("audio.status_flags")
+
+        # monotonic capture time of the first sample in this chunk
+        first_ns = mono_ns() - int(frames * 1e9 / SAMPLE_RATE)
+        # raw PCM bytes
+        self.publish(indata.tobytes(), frames, first_ns)
 
+    def publish(self, pcm: bytes, frames: int, first_ns: int):
+        """
+        Push one chunk of int16 PCM into the stream.
+        Args:
+            pcm: raw PCM bytes
+            frames: number of frames (samples per channel) in the chunk
+            first_ns: mono_ns capture time of the first sample
+        """
         # timestamp as ISO
         ts = datetime.utcnow().isoformat()
-        # raw PCM bytes
-        pcm = indata.tobytes()
+        seq = self.samples.next(frames)
         # base64-encode so Redis can store clean strings
         pcm_b64 = base64.b64encode(pcm).decode('ascii')
 
         # push into Redis stream
-        self.redis.xadd(
-            STREAM_NAME,
-            {
-                "timestamp": ts,
-                "pcm_b64": pcm_b64
-            },
-            maxlen=10_000,  # trim old entries
-            approximate=True
-        )
+        with metrics.timer("audio.xadd"):
+            self.redis.xadd(
+                STREAM_NAME,
+                {
+                    "timestamp": ts,
+                    "mono_ns": first_ns,
+                    "seq": seq,
+                    "pcm_b64": pcm_b64
+                },
+                maxlen=STREAM_MAXLEN,
+                approximate=True
+            )
+        metrics.count("audio.chunks")
 
     def start(self):
         """
         Begin capturing audio
         """
+        # PortAudio is only needed to capture, not to publish (see benchmarks/)
+        import sounddevice as sd
+
         print(f"[AudioCapture] Starting @ {SAMPLE_RATE}Hz, {CHANNELS}ch, chunk={CHUNK_SIZE}")
         self.stream = sd.InputStream(
             samplerate=SAMPLE_RATE,
@@ -59,6 +87,10 @@ class AudioCaptureService:
             except KeyboardInterrupt:
                 print("[AudioCapture] Stopping...")
 
-if __name__ == "__main__":
+def main():
     svc = AudioCaptureService()
     svc.start()
+
+if __name__ == "__main__":
+    metrics.start("audio_capture")
+    main()
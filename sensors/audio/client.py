@@ -1,48 +1,71 @@
 # sensors/audio/client.py
 
 import base64
-import redis
 from typing import Iterator, Dict
 
-from .config import REDIS_URL, STREAM_NAME
+from runtime.connections import get_redis, Backoff, CONNECTION_ERRORS
+from .config import STREAM_NAME
+
+def _parse_entry(entry_id, fields) -> Dict:
+    pcm_b64 = fields[b"pcm_b64"].decode("ascii")
+    chunk = {
+        "id": entry_id.decode(),
+        "timestamp": fields[b"timestamp"].decode(),
+        "pcm_bytes": base64.b64decode(pcm_b64)
+    }
+    # entries written before the shared clock existed lack these
+    if b"mono_ns" in fields:
+        chunk["mono_ns"] = int(fields[b"mono_ns"])
+        chunk["seq"] = int(fields[b"seq"])
+    return chunk
 
 class AudioClient:
-    def __init__(self, group: str = None, consumer: str = None):
-        self.redis = redis.Redis.from_url(REDIS_URL)
-        self.stream = STREAM_NAME
+    def __init__(self, group: str = None, consumer: str = None, stream: str = STREAM_NAME):
+        """
+        Args:
+            stream: the capture stream, or a derived one with the same layout
+                    (e.g. RESAMPLED_STREAM, 16 kHz mono)
+        """
+        self.redis = get_redis()
+        self.stream = stream
         # For simple reads we won't use consumer groups
 
     def stream_chunks(self, block_ms: int = 5000) -> Iterator[Dict]:
         """
         Yield new audio chunks as they arrive.
+        Each chunk has id, timestamp, pcm_bytes and, when the capture service
+        stamps them, mono_ns (capture time of the first sample) and seq
+        (index of the first sample).
         """
         last_id = "$"
+        backoff = Backoff()
         while True:
-            resp = self.redis.xread({self.stream: last_id}, block=block_ms, count=1)
+            try:
+                resp = self.redis.xread({self.stream: last_id}, block=block_ms, count=1)
+                backoff.reset()
+            except CONNECTION_ERRORS:
+                backoff.sleep("AudioClient")
+                continue
             if not resp:
                 continue
             _, entries = resp[0]
             for entry_id, fields in entries:
                 last_id = entry_id
-                pcm_b64 = fields[b"pcm_b64"].decode("ascii")
-                audio = base64.b64decode(pcm_b64)
-                yield {
-                    "id": entry_id.decode(),
-                    "timestamp": fields[b"timestamp"].decode(),
-                    "pcm_bytes": audio
-                }
+                yield _parse_entry(entry_id, fields)
 
-    def get_history(self, start_id: str = "-", end_id: str = "+") -> Iterator[Dict]:
+    def get_history(self, start_id: str = "-", end_id: str = "+", batch: int = 500) -> Iterator[Dict]:
         """
         Replay already-captured audio between two entry IDs.
-        Defaults to entire history.
+        Defaults to entire history. Entries are fetched `batch` at a time,
+        so long ranges don't have to fit in memory.
+        Entry IDs start with a unix time in ms, so str(int(t * 1000))
+        selects by time.
         """
-        entries = self.redis.xrange(self.stream, min=start_id, max=end_id)
-        for entry_id, fields in entries:
-            pcm_b64 = fields[b"pcm_b64"].decode("ascii")
-            audio = base64.b64decode(pcm_b64)
-            yield {
-                "id": entry_id.decode(),
-                "timestamp": fields[b"timestamp"].decode(),
-                "pcm_bytes": audio
-            }
+        lo = start_id
+        while True:
+            entries = self.redis.xrange(self.stream, min=lo, max=end_id, count=batch)
+            for entry_id, fields in entries:
+                yield _parse_entry(entry_id, fields)
+            if len(entries) < batch:
+                return
+            lo = "(" + entries[-1][0].decode()
@@ -2,11 +2,18 @@
 
 import os
 
+from runtime.config import REDIS_URL  # noqa: F401  (re-exported for older imports)
+
 # Redis
-REDIS_URL    = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 STREAM_NAME  = os.getenv("AUDIO_STREAM", "audio:pcm:stream")
 
 # Audio capture
 SAMPLE_RATE  = int(os.getenv("AUDIO_SAMPLE_RATE", "48000"))   # Hz
 CHANNELS     = int(os.getenv("AUDIO_CHANNELS", "1"))
 CHUNK_SIZE   = int(os.getenv("AUDIO_CHUNK_SIZE", "1024"))    # frames per buffer
+
+# Derived streams published by middlewares/audio_features.py
+FEATURE_RATE     = int(os.getenv("AUDIO_FEATURE_RATE", "16000"))   # Hz, mono
+RESAMPLED_STREAM = os.getenv("AUDIO_RESAMPLED_STREAM", "audio:pcm16k:stream")
+LEVELS_STREAM    = os.getenv("AUDIO_LEVELS_STREAM", "audio:levels")
+MEL_STREAM       = os.getenv("AUDIO_MEL_STREAM", "audio:mel")
@@ -0,0 +1,61 @@
+"""
+sensors/clock.py
+
+Shared timing scheme for everything that publishes sensor data.
+
+Every message a sensor (or middleware) emits carries:
+- mono_ns: CLOCK_MONOTONIC time in nanoseconds. On Linux this clock is
+  system-wide, so values from different processes on the Pi are directly
+  comparable and never jump when NTP adjusts the wall clock.
+- seq:     a per-source sequence number. Cameras count frames, microphones
+  count samples (seq is the index of the first sample in the chunk).
+
+Wall-clock timestamps are kept alongside for humans, but correlation between
+modalities should always be done on mono_ns.
+
+Standard library only: this is imported by camera_service_csi.py, which runs
+under the system python.
+"""
+
+import time
+import threading
+
+
+def mono_ns() -> int:
+    """Current CLOCK_MONOTONIC time in nanoseconds."""
+    return time.monotonic_ns()
+
+
+def mono_to_wall(ts_ns: int) -> float:
+    """Convert a mono_ns value from this host to an approximate unix time."""
+    return time.time() - (time.monotonic_ns() - ts_ns) / 1e9
+
+
+class Sequence:
+    """
+    Thread-safe, monotonically increasing counter.
+    next(step) returns the current value and advances it by `step`, so an
+    audio source can do `seq.next(frames)` to get the index of its first sample.
+    """
+
+    def __init__(self, start: int = 0):
+        self._value = start
+        self._lock = threading.Lock()
+
+    def next(self, step: int = 1) -> int:
+        with self._lock:
+            value = self._value
+            self._value += step
+            return value
+
+
+def stamp(seq: int, ts_ns: int = None) -> dict:
+    """
+    Build the common timing fields for a message.
+    Returns:
+        {"seq": int, "mono_ns": int}
+    """
+    return {
+        "seq": seq,
+        "mono_ns": ts_ns if ts_ns is not None else mono_ns(),
+    }
@@ -0,0 +1,137 @@
+"""
+sensors/vision/analysis.py
+
+Cheap per-frame statistics for vision applications.
+
+Full-resolution per-pixel work is the expensive part of most simple detectors,
+so FrameAnalyzer shrinks each frame once to a small grayscale image and
+computes every statistic on that. All intermediate images live in buffers
+allocated up front and reused for every frame, so update() does not allocate.
+
+Usage:
+    client = VisionClient()
+    analyzer = FrameAnalyzer()
+
+    frame_id, frame = client.read()
+    analyzer.update(frame)
+    if analyzer.is_white_out():
+        ...
+"""
+
+import numpy as np
+import cv2
+
+
+class FrameAnalyzer:
+    def __init__(
+        self,
+        size: tuple = (80, 60),
+        clip_low: int = 5,
+        clip_high: int = 250,
+        interpolation: int = cv2.INTER_AREA
+    ):
+        """
+        Args:
+            size: (width, height) of the reduced image statistics run on
+            clip_low: gray level at or below which a pixel counts as crushed black
+            clip_high: gray level at or above which a pixel counts as blown out
+            interpolation: cv2 resize mode; INTER_NEAREST is faster, INTER_AREA less noisy
+        """
+        w, h = size
+        self.size = size
+        self.clip_low = clip_low
+        self.clip_high = clip_high
+        self.interpolation = interpolation
+        self.pixels = w * h
+
+        self._small = np.empty((h, w, 3), dtype=np.uint8)
+        self._gray = np.empty((h, w), dtype=np.uint8)
+        self._prev = np.empty((h, w), dtype=np.uint8)
+        self._diff = np.zeros((h, w), dtype=np.uint8)
+        self._mask = np.empty((h, w), dtype=np.uint8)
+        self._lap = np.empty((h, w), dtype=np.int16)
+        self._has_prev = False
+        self._has_frame = False
+
+    def update(self, frame: np.ndarray):
+        """
+        Reduce a BGR (or grayscale) frame and prepare all statistics for it.
+        """
+        if self._has_frame:
+            # keep the previous reduced frame for motion, without copying
+            self._gray, self._prev = self._prev, self._gray
+            self._has_prev = True
+        if frame.ndim == 2:
+            cv2.resize(frame, self.size, dst=self._gray, interpolation=self.interpolation)
+        else:
+            cv2.resize(frame, self.size, dst=self._small, interpolation=self.interpolation)
+            cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        if self._has_prev:
+            cv2.absdiff(self._gray, self._prev, dst=self._diff)
+        self._has_frame = True
+        return self
+
+    @property
+    def gray(self) -> np.ndarray:
+        """The reduced grayscale frame. Overwritten by the next update()."""
+        return self._gray
+
+    def mean(self) -> float:
+        """Mean brightness, 0-255."""
+        return cv2.mean(self._gray)[0]
+
+    def histogram(self, bins: int = 32) -> np.ndarray:
+        """Brightness histogram normalised to sum to 1."""
+        hist = cv2.calcHist([self._gray], [0], None, [bins], [0, 256]).ravel()
+        return hist / self.pixels
+
+    def _count_at_least(self, level: int) -> int:
+        cv2.threshold(self._gray, level - 1, 255, cv2.THRESH_BINARY, dst=self._mask)
+        return cv2.countNonZero(self._mask)
+
+    def clipping(self):
+        """
+        Returns:
+            (low_ratio, high_ratio): fraction of pixels crushed to black / blown to white
+        """
+        high = self._count_at_least(self.clip_high)
+        low = self.pixels - self._count_at_least(self.clip_low + 1)
+        return low / self.pixels, high / self.pixels
+
+    def exposure_score(self) -> float:
+        """
+        Signed exposure in [-1, 1]: negative is under-, positive over-exposed,
+        0 is mid-gray on average.
+        """
+        return (self.mean() - 127.5) / 127.5
+
+    def blur_score(self) -> float:
+        """
+        Variance of the Laplacian of the reduced frame. Lower is blurrier.
+        Only coarse blur (motion, badly out of focus) survives the downscale,
+        so compare scores between frames of the same analyzer, not absolute.
+        """
+        cv2.Laplacian(self._gray, cv2.CV_16S, dst=self._lap)
+        _, std = cv2.meanStdDev(self._lap)
+        return float(std[0][0] ** 2)
+
+    def motion_mask(self, threshold: int = 25) -> np.ndarray:
+        """
+        Pixels that changed by more than `threshold` gray levels since the
+        previous update() (all zeros on the first frame). The returned array
+        is a reused buffer; copy it if you need to keep it.
+        """
+        cv2.threshold(self._diff, threshold, 255, cv2.THRESH_BINARY, dst=self._mask)
+        return self._mask
+
+    def motion_ratio(self, threshold: int = 25) -> float:
+        """Fraction of pixels that changed since the previous update()."""
+        return cv2.countNonZero(self.motion_mask(threshold)) / self.pixels
+
+    def is_white_out(self, ratio: float = 0.99) -> bool:
+        """True if at least `ratio` of the frame is blown out."""
+        return self._count_at_least(self.clip_high) >= ratio * self.pixels
+
+    def is_black_out(self, ratio: float = 0.99) -> bool:
+        """True if at least `ratio` of the frame is crushed to black."""
+        return self.pixels - self._count_at_least(self.clip_low + 1) >= ratio * self.pixels
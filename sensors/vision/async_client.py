@@ -0,0 +1,102 @@
+"""
+sensors/vision/async_client.py
+
+asyncio counterpart of VisionClient:
+- Subscribes to the same Redis channel of base64-JPEG frames
+- `async for` iteration over frames, skipping stale ones when the consumer lags
+- JPEG decoding runs in a worker thread so it never stalls the event loop
+
+By default all async clients share the process-wide pool from runtime.connections.
+"""
+
+import asyncio
+import json
+import base64
+
+import redis.asyncio as aioredis
+
+from runtime.connections import get_async_redis
+from .client import _decode
+from .config import VISION_CHANNEL
+
+class AsyncVisionClient:
+    def __init__(
+        self,
+        redis: aioredis.Redis = None,
+        channel: str = VISION_CHANNEL
+    ):
+        """
+        Args:
+            redis: asyncio Redis client; defaults to the process-wide pool
+            channel: Redis Pub/Sub channel delivering frames
+        """
+        self._redis = redis or get_async_redis()
+        self._channel = channel
+        self._latest = None  # (frame_id, image, meta) of the last yielded frame
+
+    async def frames(self, decode: bool = True, skip_stale: bool = True):
+        """
+        Yield frames as they arrive.
+        Args:
+            decode: yield decoded images, or the raw JPEG bytes if False
+            skip_stale: if several frames queued up while the consumer was
+                        busy, only yield the newest
+        Yields:
+            (frame_id: str, image: np.ndarray or bytes, meta: dict)
+        """
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self._channel)
+        try:
+            while True:
+                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+                if msg is None:
+                    continue
+                if skip_stale:
+                    while True:
+                        newer = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0)
+                        if newer is None:
+                            break
+                        msg = newer
+                try:
+                    payload = json.loads(msg["data"])
+                    fid = payload["frame_id"]
+                    jpg = base64.b64decode(payload["jpeg_b64"])
+                except Exception:
+                    # silently skip invalid messages
+                    continue
+                img = await asyncio.to_thread(_decode, jpg) if decode else jpg
+                meta = {
+                    "timestamp": payload.get("timestamp"),
+                    "mono_ns": payload.get("mono_ns"),
+                    "seq": payload.get("seq"),
+                }
+                self._latest = (fid, img, meta)
+                yield self._latest
+        finally:
+            await pubsub.unsubscribe(self._channel)
+            await pubsub.aclose()
+
+    def __aiter__(self):
+        return self.frames()
+
+    async def read(self, timeout: float = None):
+        """
+        Wait for the next frame.
+        Returns:
+            (frame_id: str, image: np.ndarray, meta: dict)
+        Raises:
+            TimeoutError if no frame in `timeout` seconds.
+        """
+        frames = self.frames()
+        try:
+            return await asyncio.wait_for(frames.__anext__(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No frame received in {timeout} s")
+        finally:
+            await frames.aclose()
+
+    def latest(self):
+        """
+        Non-blocking: the last frame yielded by frames(), or None.
+        """
+        return self._latest
@@ -9,31 +9,23 @@ NOTE:
 This file needs to be run using system python.
 Does not work inside uv venv because of picamera2 not being supported.
 
+If VISION_HISTORY_MAXLEN is set, the raw JPEGs are also appended to a
+capped Redis Stream so clients can replay past frames.
 """
 
 import time
-import uuid
-import base64
-import json
 import io
 
-import redis
 from picamera2 import Picamera2
 from PIL import Image
 
-# ------ Config ------
-REDIS_HOST     = 'localhost'
-REDIS_PORT     = 6379
-VISION_CHANNEL = 'sensors:vision:frames'
-
-INTERVAL_SEC   = 1.0               # seconds between captures
-RESOLUTION     = (640, 480)        # (width, height)
-
-# ------------
+from runtime import metrics
+from sensors.vision.config import INTERVAL_SEC, RESOLUTION
+from sensors.vision.publisher import FramePublisher
 
 def main():
     # 1) Connect to Redis
-    r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
+    publisher = FramePublisher()
 
     # 2) Initialize and start the Picamera2
     picam2 = Picamera2()
@@ -46,23 +38,21 @@ def main():
     try:
         while True:
             # 3) Grab an RGB array from the camera
-            rgb_array = picam2.capture_array()
+            with metrics.timer("camera.capture"):
+                rgb_array = picam2.capture_array()
+            timing = publisher.stamp()
 
-            # 4) Convert to a PIL Image
-            img = Image.fromarray(rgb_array).convert("RGB")
+            with metrics.timer("camera.encode"):
+                # 4) Convert to a PIL Image
+                img = Image.fromarray(rgb_array).convert("RGB")
 
-            # 5) JPEG-encode into a bytes buffer
-            with io.BytesIO() as buf:
-                img.save(buf, format='JPEG')
-                jpeg_bytes = buf.getvalue()
+                # 5) JPEG-encode into a bytes buffer
+                with io.BytesIO() as buf:
+                    img.save(buf, format='JPEG')
+                    jpeg_bytes = buf.getvalue()
 
             # 6) Base64 + JSON + publish
-            payload = {
-                "frame_id":  str(uuid.uuid4()),
-                "timestamp": time.time(),
-                "jpeg_b64":  base64.b64encode(jpeg_bytes).decode('ascii')
-            }
-            r.publish(VISION_CHANNEL, json.dumps(payload))
+            publisher.publish(jpeg_bytes, timing)
 
             # 7) Pause until next capture
             time.sleep(INTERVAL_SEC)
@@ -73,4 +63,5 @@ def main():
         picam2.stop()
 
 if __name__ == '__main__':
+    metrics.start("camera")
     main()
@@ -6,62 +6,167 @@ VisionClient for redis_picamera_service.py:
 - Subscribes to a Redis channel of base64-JPEG frames
 - Decodes and caches the latest frame
 - Provides blocking read() and non-blocking latest() methods
+- Hands the raw JPEGs to listeners (e.g. recorders) without decoding
+- Replays past frames from the camera's history stream
+- Promotes frames to long-term storage on disk with mark_persistent()
 """
 
+import os
 import threading
 import time
 import json
 import base64
+import logging
+from collections import OrderedDict
 
 import redis
-import numpy as np
-import cv2
+
+from runtime import metrics
+from runtime.connections import get_redis, Backoff, CONNECTION_ERRORS
+from sensors.clock import mono_ns
+from .config import (
+    VISION_CHANNEL, HISTORY_STREAM,
+    PERSISTENT_DIR, PERSISTENT_PREFIX,
+)
+
+# how many recent raw frames to keep around for mark_persistent()
+RECENT_FRAMES = 64
+# how many frame_id -> history entry ID mappings to keep for older ones
+RECENT_HISTORY_IDS = 10_000
+
+@metrics.timer("vision_client.decode")
+def _decode(jpg: bytes):
+    # cv2 takes a while to import: only pay for it once a frame is decoded,
+    # so clients created with decode=False never load it
+    import numpy as np
+    import cv2
+    arr = np.frombuffer(jpg, dtype=np.uint8)
+    return cv2.imdecode(arr, cv2.IMREAD_COLOR)
+
+def _history_meta(entry_id: bytes, fields: dict) -> dict:
+    return {
+        "timestamp": float(fields[b"timestamp"]),
+        "mono_ns": int(fields[b"mono_ns"]) if b"mono_ns" in fields else None,
+        "seq": int(fields[b"seq"]) if b"seq" in fields else None,
+        "history_id": entry_id.decode(),
+    }
+
+def _write_atomic(path: str, data: bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
 
 class VisionClient:
     def __init__(
         self,
-        host: str = "localhost",
-        port: int = 6379,
-        channel: str = "sensors:vision:frames"
+        host: str = None,
+        port: int = None,
+        channel: str = VISION_CHANNEL,
+        history_stream: str = HISTORY_STREAM,
+        redis_client: redis.Redis = None,
+        decode: bool = True,
+        persistent_dir: str = PERSISTENT_DIR
     ):
         """
         Connect to Redis and start a background listener.
         Args:
-            host: Redis server hostname
-            port: Redis server port
+            host: Redis server hostname, for a dedicated connection
+            port: Redis server port, for a dedicated connection
             channel: Redis Pub/Sub channel delivering frames
+            history_stream: Redis Stream the camera keeps past frames in
+            redis_client: defaults to the process-wide pooled client, or to a
+                          connection to host/port if either is given
+            decode: decode frames into images; if False, read() and latest()
+                    return the raw JPEG bytes and no decoding is done at all
+            persistent_dir: where mark_persistent() stores frames
         """
-        self._redis = redis.Redis(host=host, port=port)
+        if redis_client is None and (host is not None or port is not None):
+            redis_client = redis.Redis(host=host or "localhost", port=port or 6379)
+        self._redis = redis_client or get_redis()
         self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
         self._pubsub.subscribe(channel)
+        self._history = history_stream
+        self._decode = decode
+        self._persistent_dir = persistent_dir
+        self._listeners = []
 
         self._lock = threading.Lock()
         self._latest = None  # will hold (frame_id: str, image: np.ndarray)
+        self._latest_meta = None  # timing fields of the latest frame
+        self._recent = OrderedDict()  # frame_id -> (jpeg bytes, meta)
+        self._history_ids = OrderedDict()  # frame_id -> history entry ID
 
         # launch listener thread
         t = threading.Thread(target=self._listener, daemon=True)
         t.start()
 
     def _listener(self):
-        for msg in self._pubsub.listen():
+        backoff = Backoff()
+        while True:
             try:
-                payload = json.loads(msg["data"])
-                fid = payload["frame_id"]
-                b64 = payload["jpeg_b64"]
-                jpg = base64.b64decode(b64)
-                arr = np.frombuffer(jpg, dtype=np.uint8)
-                img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-                with self._lock:
-                    self._latest = (fid, img)
+                # pubsub resubscribes by itself once the connection is back
+                for msg in self._pubsub.listen():
+                    backoff.reset()
+                    self._handle(msg)
+            except CONNECTION_ERRORS:
+                backoff.sleep("VisionClient")
+
+    def _handle(self, msg):
+        try:
+            payload = json.loads(msg["data"])
+            fid = payload["frame_id"]
+            b64 = payload["jpeg_b64"]
+            jpg = base64.b64decode(b64)
+            img = _decode(jpg) if self._decode else jpg
+            meta = {
+                "timestamp": payload.get("timestamp"),
+                "mono_ns": payload.get("mono_ns"),
+                "seq": payload.get("seq"),
+                "history_id": payload.get("history_id"),
+            }
+            if meta["mono_ns"] is not None:
+                # capture → decoded in this process
+                metrics.observe("vision_client.frame_age", (mono_ns() - meta["mono_ns"]) / 1e6)
+            metrics.count("vision_client.frames")
+            with self._lock:
+                self._latest = (fid, img)
+                self._latest_meta = meta
+                self._recent[fid] = (jpg, meta)
+                if len(self._recent) > RECENT_FRAMES:
+                    self._recent.popitem(last=False)
+                if meta["history_id"]:
+                    self._history_ids[fid] = meta["history_id"]
+                    if len(self._history_ids) > RECENT_HISTORY_IDS:
+                        self._history_ids.popitem(last=False)
+        except Exception as e:
+            logging.warning("[VisionClient] skipping invalid frame message: %r", e)
+            return
+        for callback in self._listeners:
+            try:
+                callback(fid, jpg, meta)
             except Exception:
-                # silently skip invalid messages
-                continue
+                logging.exception("[VisionClient] frame listener %r failed", callback)
+
+    def add_listener(self, callback):
+        """
+        Call `callback(frame_id, jpeg_bytes, meta)` for every frame received.
+        Callbacks run on the listener thread: hand slow work (disk, network)
+        to another thread or frames will back up.
+        """
+        self._listeners.append(callback)
 
-    def read(self, timeout: float = None):
+    def read(self, timeout: float = None, with_meta: bool = False):
         """
         Blocking: wait until the first frame arrives (or timeout).
+        Args:
+            with_meta: also return the frame's timing fields
+                       {"timestamp", "mono_ns", "seq"} (see sensors/clock.py)
         Returns:
-            (frame_id: str, image: np.ndarray)
+            (frame_id: str, image: np.ndarray), or
+            (frame_id: str, image: np.ndarray, meta: dict) if with_meta
         Raises:
             TimeoutError if no frame in `timeout` seconds.
         """
@@ -69,6 +174,8 @@ class VisionClient:
         while True:
             with self._lock:
                 if self._latest is not None:
+                    if with_meta:
+                        return (*self._latest, self._latest_meta)
                     return self._latest
             if timeout is not None and (time.time() - start) >= timeout:
                 raise TimeoutError(f"No frame received in {timeout} s")
@@ -82,3 +189,97 @@ class VisionClient:
         """
         with self._lock:
             return self._latest
+
+    def replay(self, start: float = None, end: float = None, decode: bool = True, batch: int = 256):
+        """
+        Replay frames from the history stream between two unix timestamps.
+        Requires the camera service to run with VISION_HISTORY_MAXLEN > 0.
+        Args:
+            start, end: unix seconds; None means oldest / newest
+            decode: yield decoded images, or the raw JPEG bytes if False
+            batch: frames fetched per round-trip
+        Yields:
+            (frame_id: str, image: np.ndarray or bytes, meta: dict);
+            meta["history_id"] can be passed to mark_persistent()
+        """
+        # stream IDs are "<ms>-<seq>", so time ranges map directly onto them
+        lo = "-" if start is None else str(int(start * 1000))
+        hi = "+" if end is None else str(int(end * 1000))
+        while True:
+            entries = self._redis.xrange(self._history, min=lo, max=hi, count=batch)
+            for entry_id, fields in entries:
+                jpg = fields[b"jpeg"]
+                yield (
+                    fields[b"frame_id"].decode(),
+                    _decode(jpg) if decode else jpg,
+                    _history_meta(entry_id, fields),
+                )
+            if len(entries) < batch:
+                return
+            lo = "(" + entries[-1][0].decode()
+
+    def _find(self, frame_id: str, history_id: str = None):
+        with self._lock:
+            if frame_id in self._recent:
+                return self._recent[frame_id]
+            history_id = history_id or self._history_ids.get(frame_id)
+        if history_id is None:
+            return None
+        # a single entry, by its ID
+        entries = self._redis.xrange(self._history, min=history_id, max=history_id)
+        if not entries or entries[0][1][b"frame_id"].decode() != frame_id:
+            return None
+        entry_id, fields = entries[0]
+        return fields[b"jpeg"], _history_meta(entry_id, fields)
+
+    def _persistent_path(self, frame_id: str, ext: str) -> str:
+        # frame ids are UUIDs; keep anything else from escaping the directory
+        return os.path.join(self._persistent_dir, os.path.basename(frame_id) + ext)
+
+    def mark_persistent(self, frame_id: str, meta: dict = None, history_id: str = None):
+        """
+        Promote a frame to long-term storage: <frame_id>.jpg and <frame_id>.json
+        under persistent_dir. The frame must be one of the last RECENT_FRAMES
+        this client received, or still be in the history stream.
+        Args:
+            frame_id: id of the frame to keep
+            meta: application data stored with the frame
+            history_id: the frame's history entry ID, for frames from replay()
+                        (meta["history_id"]); known already for live frames
+        Raises:
+            KeyError if the frame is no longer available.
+        """
+        found = self._find(frame_id, history_id)
+        if found is None:
+            raise KeyError(f"Frame {frame_id!r} is no longer available")
+        jpg, frame_meta = found
+        record = {
+            "frame_id": frame_id,
+            "timestamp": frame_meta.get("timestamp") or time.time(),
+            "mono_ns": frame_meta.get("mono_ns"),
+            "seq": frame_meta.get("seq"),
+            "meta": meta or {},
+        }
+        os.makedirs(self._persistent_dir, exist_ok=True)
+        # the JPEG first: a .json file always has its image
+        _write_atomic(self._persistent_path(frame_id, ".jpg"), jpg)
+        _write_atomic(self._persistent_path(frame_id, ".json"), json.dumps(record).encode())
+
+    def load_persistent(self, frame_id: str):
+        """
+        Load a frame saved with mark_persistent().
+        Returns:
+            (image: np.ndarray, meta: dict) or None if unknown
+        """
+        try:
+            with open(self._persistent_path(frame_id, ".json")) as f:
+                record = json.load(f)
+            with open(self._persistent_path(frame_id, ".jpg"), "rb") as f:
+                return _decode(f.read()), record["meta"]
+        except FileNotFoundError:
+            pass
+        # saved by an earlier version, in Redis
+        fields = self._redis.hgetall(f"{PERSISTENT_PREFIX}{frame_id}")
+        if not fields:
+            return None
+        return _decode(fields[b"jpeg"]), json.loads(fields[b"meta"])
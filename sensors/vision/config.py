@@ -0,0 +1,27 @@
+# sensors/vision/config.py
+
+import os
+
+# Redis (connection settings live in runtime/config.py)
+VISION_CHANNEL = os.getenv("VISION_CHANNEL", "sensors:vision:frames")
+
+# Latest frame's timing, for the status monitor
+LAST_FRAME_KEY = os.getenv("VISION_LAST_FRAME_KEY", "sensors:vision:last")
+
+# Frame history (capped Redis Stream of raw JPEGs); 0 disables it
+HISTORY_STREAM = os.getenv("VISION_HISTORY_STREAM", "sensors:vision:history")
+HISTORY_MAXLEN = int(os.getenv("VISION_HISTORY_MAXLEN", "0"))    # frames
+
+# Frames promoted to long-term storage by VisionClient.mark_persistent():
+# <frame_id>.jpg and <frame_id>.json in this directory
+PERSISTENT_DIR    = os.getenv("VISION_PERSISTENT_DIR", os.path.expanduser("~/chakna/persistent_frames"))
+# where earlier versions kept them, in Redis hashes; still read by load_persistent()
+PERSISTENT_PREFIX = os.getenv("VISION_PERSISTENT_PREFIX", "vision:persistent:")
+
+# Camera capture
+INTERVAL_SEC   = float(os.getenv("INTERVAL_SEC", 1.0))         # seconds between captures
+RESOLUTION     = (
+    int(os.getenv("FRAME_WIDTH", 640)),
+    int(os.getenv("FRAME_HEIGHT", 480)),
+)
+CAMERA_INDEX   = int(os.getenv("CAMERA_INDEX", 0))
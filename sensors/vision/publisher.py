@@ -0,0 +1,67 @@
+"""
+sensors/vision/publisher.py
+
+Publishes encoded frames the way every camera service does:
+- live on the VISION_CHANNEL pub/sub channel (base64 JPEG in JSON)
+- timing of the latest frame in LAST_FRAME_KEY, for the status monitor
+- raw JPEG in the capped history stream, if VISION_HISTORY_MAXLEN is set
+
+The live message carries the frame's history entry ID (history_id), so
+clients can fetch the frame again with a single XRANGE. That takes a second
+round-trip per frame when history is on; otherwise it is one pipelined
+round-trip.
+Standard library and redis only: used by camera_service_csi.py under the system python.
+"""
+
+import time
+import uuid
+import json
+import base64
+
+from runtime import metrics
+from runtime.connections import get_redis
+from sensors.clock import Sequence, stamp
+from sensors.vision.config import (
+    VISION_CHANNEL, LAST_FRAME_KEY, HISTORY_STREAM, HISTORY_MAXLEN,
+)
+
+class FramePublisher:
+    def __init__(self, redis_client=None, channel: str = VISION_CHANNEL):
+        self.r = redis_client or get_redis()
+        self.channel = channel
+        self.frames = Sequence()
+
+    def stamp(self) -> dict:
+        """Timing fields for a frame; call right after capturing it."""
+        return stamp(self.frames.next())
+
+    def publish(self, jpeg_bytes: bytes, timing: dict) -> str:
+        """
+        Publish one JPEG frame.
+        Returns:
+            the new frame_id
+        """
+        fid = str(uuid.uuid4())
+        ts = time.time()
+        payload = {
+            "frame_id":  fid,
+            "timestamp": ts,
+            **timing,
+            "jpeg_b64":  base64.b64encode(jpeg_bytes).decode("ascii")
+        }
+        with metrics.timer("camera.publish"):
+            # keep raw bytes in the history stream for replay, then publish live
+            if HISTORY_MAXLEN:
+                history_id = self.r.xadd(HISTORY_STREAM, {
+                    "frame_id":  fid,
+                    "timestamp": ts,
+                    **timing,
+                    "jpeg":      jpeg_bytes,
+                }, maxlen=HISTORY_MAXLEN, approximate=True)
+                payload["history_id"] = history_id.decode()
+            pipe = self.r.pipeline(transaction=False)
+            pipe.publish(self.channel, json.dumps(payload))
+            pipe.hset(LAST_FRAME_KEY, mapping={"timestamp": ts, **timing})
+            pipe.execute()
+        metrics.count("camera.frames")
+        return fid
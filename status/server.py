@@ -1,51 +1,306 @@
-import json, os, subprocess
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import json, os, subprocess, threading, time, logging
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from runtime import metrics as instrumentation
+from runtime.connections import get_redis
+from runtime.retention import USAGE_KEY as RETENTION_USAGE_KEY
+from runtime.supervisor import WORKERS_KEY
+from sensors.audio.config import STREAM_NAME as AUDIO_STREAM, RESAMPLED_STREAM, LEVELS_STREAM, MEL_STREAM
+from sensors.vision.config import LAST_FRAME_KEY, HISTORY_STREAM
+
+# how often unit state and metrics are refreshed, independent of viewers
+POLL_SEC = float(os.getenv("STATUS_POLL_SEC", "2.0"))
 
 # Define your services and (optional) hardware mapping:
 SERVICES = [
     {
       'name': 'Camera',
       'unit': 'chakna-camera.service',
-      'hardware': '/dev/video0'
+      'hardware': '/dev/video0',
+      'worker': 'camera'
     },
     {
       'name': 'Audio Capture',
       'unit': 'chakna-audio-sensor.service',
-      'hardware': 'ALSA default input'
+      'hardware': 'ALSA default input',
+      'worker': 'audio_capture'
     },
     {
       'name': 'Speaker',
       'unit': 'chakna-audio-speaker.service',
-      'hardware': 'ALSA default output'
+      'hardware': 'ALSA default output',
+      'worker': 'speaker'
+    },
+    {
+      'name': 'Stream Retention',
+      'unit': 'chakna-retention.service',
+      'hardware': 'Redis',
+      'worker': 'retention'
+    },
+    {
+      'name': 'Supervisor',
+      'unit': 'chakna-supervisor.service',
+      'hardware': 'see workers'
     },
 ]
 
+# Streams whose length and memory are reported
+STREAMS = [
+    AUDIO_STREAM,
+    RESAMPLED_STREAM,
+    LEVELS_STREAM,
+    MEL_STREAM,
+    'audio:stream',
+    'audio:transcriptions',
+    'audio:keywords',
+    'vision:faces',
+    'fusion:events',
+    HISTORY_STREAM,
+]
+
+def unit_states(workers=None):
+    """
+    State of every unit, with a single systemctl call. A unit that isn't
+    running while its `worker` runs under the supervisor (`workers`, as
+    published in supervisor:workers) is shown as supervised instead.
+    """
+    workers = workers or {}
+    units = [svc['unit'] for svc in SERVICES]
+    try:
+        out = subprocess.run(
+          ['systemctl', 'is-active', *units],
+          capture_output=True, text=True, check=False, timeout=5
+        ).stdout.split()
+    except Exception:
+        out = []
+    if len(out) != len(units):
+        out = ['unknown'] * len(units)
+    states = []
+    for svc, state in zip(SERVICES, out):
+        worker = workers.get(svc.get('worker'))
+        if state != 'active' and worker:
+            state = 'supervised' if worker['state'] == 'running' else f"supervised, {worker['state']}"
+        states.append({'name': svc['name'], 'status': state, 'hardware': svc['hardware']})
+    return states
+
+class MetricsCollector:
+    """
+    Reads pipeline metrics from Redis. Rates are computed from the change
+    in sequence numbers / stream counters between two polls.
+    """
+
+    def __init__(self):
+        self.r = get_redis()
+        self.prev = {}  # name -> (value, time)
+
+    def _rate(self, name, value, now):
+        prev = self.prev.get(name)
+        self.prev[name] = (value, now)
+        if prev is None or value < prev[0] or now <= prev[1]:
+            return None
+        return round((value - prev[0]) / (now - prev[1]), 2)
+
+    def collect(self):
+        now = time.time()
+        m = {}
+
+        frame = self.r.hgetall(LAST_FRAME_KEY)
+        m['camera_fps'] = self._rate('camera', int(frame[b'seq']), now) if frame else None
+
+        streams = {}
+        for name in STREAMS:
+            if not self.r.exists(name):
+                continue
+            info = self.r.xinfo_stream(name)
+            streams[name] = {
+                'length': info['length'],
+                'memory_bytes': self.r.memory_usage(name, samples=5),
+            }
+            if name == AUDIO_STREAM:
+                # entries-added (Redis 7+) keeps counting when the stream is trimmed
+                added = info.get('entries-added', info['length'])
+                m['audio_chunks_per_sec'] = self._rate('audio', added, now)
+        # age of the oldest entry and the budget, from the retention service
+        usage = self.r.get(RETENTION_USAGE_KEY)
+        if usage:
+            for name, u in json.loads(usage)['streams'].items():
+                if name in streams:
+                    streams[name]['oldest_sec'] = u['oldest_sec']
+                    streams[name]['retention_sec'] = u['retention_sec']
+        m['streams'] = streams
+
+        mem = self.r.info('memory')
+        m['redis_memory'] = {
+            'used_bytes': mem.get('used_memory'),
+            'used_human': mem.get('used_memory_human'),
+            'max_bytes': mem.get('maxmemory'),
+        }
+
+        last = self.r.xrevrange('audio:transcriptions', count=1)
+        if last and b'latency_ms' in last[0][1]:
+            m['transcription_latency_ms'] = float(last[0][1][b'latency_ms'])
+
+        # workers run by runtime/supervisor.py, if it is used
+        m['workers'] = {
+            name.decode(): json.loads(h) for name, h in sorted(self.r.hgetall(WORKERS_KEY).items())
+        }
+
+        # hot-path timings exported by runtime.metrics in each service
+        services = self.service_metrics()
+        # faces run as a supervisor thread export under the supervisor
+        face = (services.get('face_middleware') or services.get('supervisor') or {}).get('face.frame')
+        if face and face['last'] is not None:
+            m['face_frame_ms'] = round(face['last'], 1)
+        m['hot_paths'] = {
+            service: {
+                name: {k: data[k] for k in ('last', 'p50', 'p95', 'count')}
+                for name, data in sorted(exported.items()) if data['type'] == 'histogram'
+            }
+            for service, exported in sorted(services.items())
+        }
+        return m
+
+    def service_metrics(self):
+        """{service: {metric: exported dict}} for every service exporting metrics."""
+        services = {}
+        for service in self.r.smembers(instrumentation.SERVICES_KEY):
+            service = service.decode()
+            data = self.r.hgetall(instrumentation.KEY_PREFIX + service)
+            if not data:
+                continue  # expired: the service is gone
+            services[service] = {k.decode(): json.loads(v) for k, v in data.items()}
+        return services
+
+class StatusCache:
+    """
+    Polls unit state and metrics in the background and keeps the latest
+    snapshot, so requests never fork systemctl or hit Redis themselves.
+    """
+
+    def __init__(self, interval=POLL_SEC):
+        self.interval = interval
+        self.metrics = MetricsCollector()
+        self.cond = threading.Condition()
+        self.version = 0
+        self.snapshot = {'services': [], 'metrics': {}, 'timestamp': None}
+
+    def start(self):
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _loop(self):
+        while True:
+            try:
+                metrics = self.metrics.collect()
+            except Exception:
+                logging.exception("Collecting metrics failed")
+                metrics = {}
+            services = unit_states(metrics.get('workers'))
+            with self.cond:
+                self.snapshot = {'services': services, 'metrics': metrics, 'timestamp': time.time()}
+                self.version += 1
+                self.cond.notify_all()
+            time.sleep(self.interval)
+
+    def get(self):
+        with self.cond:
+            return self.version, self.snapshot
+
+    def wait(self, version, timeout):
+        """Block until a snapshot newer than `version` exists (or timeout)."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.version > version, timeout)
+            return self.version, self.snapshot
+
+CACHE = StatusCache()
+
 class Handler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == '/status':
-            data = []
-            for svc in SERVICES:
-                # get systemd state
-                try:
-                    s = subprocess.run(
-                      ['systemctl', 'is-active', svc['unit']],
-                      capture_output=True, text=True, check=False
-                    ).stdout.strip()
-                except Exception:
-                    s = 'unknown'
-                data.append({
-                    'name': svc['name'],
-                    'status': s,
-                    'hardware': svc['hardware']
-                })
-            self.send_response(200)
-            self.send_header('Content-Type','application/json')
+    def _json(self, data):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type','application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _events(self):
+        # server-sent events: push every new snapshot to the dashboard
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        version = -1
+        try:
+            while True:
+                new_version, snapshot = CACHE.wait(version, timeout=15)
+                if new_version == version:
+                    self.wfile.write(b': keep-alive\n\n')
+                else:
+                    version = new_version
+                    self.wfile.write(f"data: {json.dumps(snapshot)}\n\n".encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def _text(self, text, status=200, ctype='text/plain; charset=utf-8'):
+        body = text.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        # /profile?service=face_middleware&seconds=10 starts a sampling profile
+        url = urlparse(self.path)
+        if url.path != '/profile':
+            self.send_response(404)
             self.end_headers()
-            self.wfile.write(json.dumps(data).encode())
+            return
+        query = parse_qs(url.query)
+        try:
+            seconds = float(query.get('seconds', ['10'])[0])
+        except ValueError:
+            seconds = None
+        # rejects nan and inf as well
+        if seconds is None or not 0 < seconds < float('inf'):
+            self._text("seconds must be a positive number\n", status=400)
+            return
+        request = {
+            'service': query.get('service', ['*'])[0],
+            'seconds': min(seconds, instrumentation.PROFILE_MAX_SEC),
+        }
+        get_redis().publish(instrumentation.PROFILE_CHANNEL, json.dumps(request))
+        self._text(f"profiling {request['service']} for {request['seconds']}s\n", status=202)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/metrics':
+            # Prometheus text exposition of every service's hot-path metrics
+            services = CACHE.metrics.service_metrics()
+            self._text(instrumentation.prometheus_text(services), ctype='text/plain; version=0.0.4')
+            return
+        if url.path == '/profile':
+            # collapsed stacks from the last profile of ?service=
+            service = parse_qs(url.query).get('service', [''])[0]
+            stacks = get_redis().get(instrumentation.PROFILE_PREFIX + service)
+            if stacks is None:
+                self._text("no profile yet\n", status=404)
+            else:
+                self._text(stacks.decode())
+            return
+        if url.path == '/status':
+            self._json(CACHE.get()[1]['services'])
+            return
+        if url.path == '/snapshot':
+            self._json(CACHE.get()[1])
+            return
+        if url.path == '/events':
+            self._events()
             return
 
         # serve static files (index.html, style.css)
-        path = self.path.lstrip('/') or 'index.html'
+        path = url.path.lstrip('/') or 'index.html'
         full = os.path.join(os.path.dirname(__file__), path)
         if os.path.exists(full) and os.path.isfile(full):
             ext = os.path.splitext(full)[1]
@@ -63,7 +318,14 @@ class Handler(BaseHTTPRequestHandler):
             self.send_response(404)
             self.end_headers()
 
+    def log_message(self, format, *args):
+        # dashboards refresh constantly; keep the journal quiet
+        pass
+
 if __name__ == '__main__':
     addr = ('0.0.0.0', 9000)
+    CACHE.start()
     print(f"Serving status page on http://{addr[0]}:{addr[1]}")
-    HTTPServer(addr, Handler).serve_forever()
+    server = ThreadingHTTPServer(addr, Handler)
+    server.daemon_threads = True
+    server.serve_forever()
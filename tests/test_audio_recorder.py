@@ -0,0 +1,59 @@
+import os
+import wave
+
+from applications.audio_recorder import StreamingRecorder, SAMPLE_WIDTH
+from sensors.audio.config import SAMPLE_RATE, CHANNELS
+
+CHUNK_FRAMES = 1024
+
+
+def history_chunks(seconds: float, start_ms: int = 1_700_000_000_000):
+    """Chunks as AudioClient.get_history() yields them, with increasing sample values."""
+    chunk_bytes = CHUNK_FRAMES * CHANNELS * SAMPLE_WIDTH
+    n = int(seconds * SAMPLE_RATE / CHUNK_FRAMES)
+    for i in range(n):
+        added_ms = start_ms + (i + 1) * CHUNK_FRAMES * 1000 // SAMPLE_RATE
+        pcm = bytes([i % 256]) * chunk_bytes
+        yield {"id": f"{added_ms}-0", "timestamp": "", "pcm_bytes": pcm}
+
+
+def test_export_with_strftime_pattern_keeps_every_segment(tmp_path):
+    # the whole export is written well within one wall-clock second
+    chunks = list(history_chunks(3.5))
+    pattern = str(tmp_path / "mic-%Y%m%d-%H%M%S.wav")
+    recorder = StreamingRecorder(pattern, segment_seconds=1.0)
+
+    paths = recorder.record(chunks)
+
+    assert len(paths) == 4
+    assert len(set(paths)) == 4
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in paths)
+    # one second per file, nothing lost
+    frames = []
+    for path in paths:
+        with wave.open(path, "rb") as wf:
+            frames.append(wf.getnframes())
+    assert frames[:3] == [SAMPLE_RATE] * 3
+    assert sum(frames) == len(chunks) * CHUNK_FRAMES
+
+
+def test_segments_are_named_after_capture_time(tmp_path):
+    chunks = list(history_chunks(2.5))
+    pattern = str(tmp_path / "mic-%H%M%S.wav")
+
+    paths = StreamingRecorder(pattern, segment_seconds=1.0).record(chunks)
+
+    # each segment starts one second of audio after the previous one
+    names = [os.path.basename(p) for p in paths]
+    seconds = [int(name[len("mic-"):-len(".wav")][-2:]) for name in names]
+    assert [(s - seconds[0]) % 60 for s in seconds] == [0, 1, 2]
+
+
+def test_coarse_pattern_gets_an_index(tmp_path):
+    chunks = list(history_chunks(2.5))
+    pattern = str(tmp_path / "mic-%Y%m%d.wav")
+
+    paths = StreamingRecorder(pattern, segment_seconds=1.0).record(chunks)
+
+    assert len(set(paths)) == 3
+    assert all(os.path.exists(p) for p in paths)
@@ -0,0 +1,31 @@
+import numpy as np
+
+from middlewares.keyword_spotting import TemplateMatcher, normalize
+
+N_MELS = 40
+
+
+def best_score(template, frames, seed=1):
+    """Lowest score the matcher reports over `frames`, padded with noise."""
+    rng = np.random.default_rng(seed)
+    noise = lambda n: rng.normal(size=(n, N_MELS)).astype(np.float32)
+    stream = normalize(np.concatenate([noise(20), frames, noise(20)])).astype(np.float32)
+    matcher = TemplateMatcher("kw", template)
+    return min(matcher.step(frame) for frame in stream)
+
+
+def test_matches_within_half_to_twice_the_template_speed():
+    template = np.random.default_rng(0).normal(size=(30, N_MELS)).astype(np.float32)
+
+    assert best_score(template, template) < 0.01
+    assert best_score(template, np.repeat(template, [1, 2] * 15, axis=0)) < 0.01  # 1.5x slower
+    assert best_score(template, np.repeat(template, 2, axis=0)) < 0.01            # 2x slower
+    assert best_score(template, template[::2]) < 0.1                               # 2x faster
+
+
+def test_rejects_a_template_stretched_past_twice():
+    template = np.random.default_rng(0).normal(size=(30, N_MELS)).astype(np.float32)
+
+    # without the slope limit, holding each template frame scores ~0 here
+    assert best_score(template, np.repeat(template, 3, axis=0)) > 0.3
+    assert best_score(template, np.repeat(template, 5, axis=0)) > 0.3
@@ -0,0 +1,166 @@
+import gzip
+import json
+import os
+import time
+
+from runtime import retention
+from runtime.policy import DEFAULT_POLICY, load_policy, producer_maxlen
+from runtime.retention import RetentionManager
+from sensors.audio.config import STREAM_NAME as AUDIO_STREAM, SAMPLE_RATE, CHUNK_SIZE
+
+NOW_MS = 1_700_000_000_000
+
+
+def _parse(entry_id, upper: bool):
+    """Stream ID or XRANGE bound -> (ms, seq, exclusive)."""
+    if isinstance(entry_id, bytes):
+        entry_id = entry_id.decode()
+    exclusive = entry_id.startswith("(")
+    entry_id = entry_id.lstrip("(")
+    if entry_id == "-":
+        return (0, 0), False
+    if entry_id == "+":
+        return (float("inf"), 0), False
+    ms, _, seq = entry_id.partition("-")
+    return (int(ms), int(seq) if seq else (float("inf") if upper else 0)), exclusive
+
+
+class FakeRedis:
+    """The stream commands RetentionManager uses, in memory."""
+
+    def __init__(self, now_ms: int = NOW_MS):
+        self.now_ms = now_ms
+        self.streams = {}  # name -> [(id bytes, fields)]
+        self.kv = {}
+
+    def add(self, stream: str, ms: int, fields: dict):
+        entries = self.streams.setdefault(stream, [])
+        last = _parse(entries[-1][0], False)[0] if entries else (-1, -1)
+        seq = last[1] + 1 if last[0] == ms else 0
+        # values come back as bytes, like redis-py returns them
+        entries.append((f"{ms}-{seq}".encode(), {k.encode(): v.encode() for k, v in fields.items()}))
+
+    def ids(self, stream: str):
+        return [_parse(entry_id, False)[0][0] for entry_id, _ in self.streams.get(stream, [])]
+
+    def time(self):
+        return self.now_ms // 1000, self.now_ms % 1000 * 1000
+
+    def exists(self, stream):
+        return int(stream in self.streams)
+
+    def xinfo_stream(self, stream):
+        entries = self.streams[stream]
+        return {
+            "length": len(entries),
+            "first-entry": entries[0] if entries else None,
+            "last-entry": entries[-1] if entries else None,
+        }
+
+    def memory_usage(self, stream, samples=None):
+        return sum(len(v) for _, fields in self.streams[stream] for v in fields.values())
+
+    def info(self, section):
+        return {"used_memory": 1}
+
+    def xrange(self, stream, min="-", max="+", count=None):
+        lo, lo_excl = _parse(min, False)
+        hi, hi_excl = _parse(max, True)
+        out = []
+        for entry_id, fields in self.streams.get(stream, []):
+            key = _parse(entry_id, False)[0]
+            if key < lo or (lo_excl and key == lo) or key > hi or (hi_excl and key == hi):
+                continue
+            out.append((entry_id, fields))
+            if count and len(out) == count:
+                break
+        return out
+
+    def xtrim(self, stream, minid=None, approximate=True):
+        before = len(self.streams[stream])
+        bound = _parse(str(minid), False)[0]
+        self.streams[stream] = [e for e in self.streams[stream] if _parse(e[0], False)[0] >= bound]
+        return before - len(self.streams[stream])
+
+    def get(self, key):
+        return self.kv.get(key)
+
+    def set(self, key, value, ex=None):
+        self.kv[key] = value.encode() if isinstance(value, str) else value
+
+
+def fill(r, stream: str, seconds: float, per_sec: float):
+    """Entries from `seconds` ago up to now."""
+    n = int(seconds * per_sec)
+    for i in range(n + 1):
+        r.add(stream, NOW_MS - int((n - i) * 1000 / per_sec), {"v": str(i)})
+
+
+def test_nothing_inside_the_policy_window_is_trimmed():
+    r = FakeRedis()
+    policy = {}
+    for stream, p in DEFAULT_POLICY.items():
+        if not p.get("seconds"):
+            continue
+        # time budgets only: max_mb is allowed to cut into the window
+        policy[stream] = {"seconds": p["seconds"]}
+        fill(r, stream, 2 * p["seconds"], per_sec=min(1.0, 1000 / p["seconds"]))
+    before = {stream: r.ids(stream) for stream in policy}
+
+    RetentionManager(policy, memory_budget_mb=0, archive_dir="", redis_client=r).enforce()
+
+    for stream, p in policy.items():
+        cutoff = NOW_MS - p["seconds"] * 1000
+        assert r.ids(stream) == [ms for ms in before[stream] if ms >= cutoff], stream
+
+
+def test_producer_maxlen_covers_the_policy_window():
+    from sensors.audio import audio_service
+    from sensors.vision.config import INTERVAL_SEC
+    from middlewares import audio_features, fusion
+    from middlewares.face_recognition import middleware as faces
+
+    chunks_per_sec = SAMPLE_RATE / CHUNK_SIZE
+    caps = [
+        (AUDIO_STREAM, audio_service.STREAM_MAXLEN, chunks_per_sec),
+        (audio_features.LEVELS_STREAM, audio_features.LEVELS_MAXLEN, chunks_per_sec),
+        (audio_features.RESAMPLED_STREAM, audio_features.RESAMPLED_MAXLEN, chunks_per_sec),
+        (audio_features.MEL_STREAM, audio_features.MEL_MAXLEN, chunks_per_sec),
+        (fusion.FUSION_STREAM, fusion.FUSION_MAXLEN, 1 / fusion.WINDOW_SEC),
+        (faces.FACES_STREAM, faces.FACES_MAXLEN, 1 / INTERVAL_SEC),
+    ]
+    for stream, maxlen, per_sec in caps:
+        assert maxlen >= DEFAULT_POLICY[stream]["seconds"] * per_sec, stream
+    # streams without a time budget are not capped by count
+    assert producer_maxlen("some:events", 1.0) is None
+
+
+def test_malformed_policy_override_is_ignored(monkeypatch):
+    monkeypatch.setenv("RETENTION_POLICY", "{not json")
+    assert load_policy() == DEFAULT_POLICY
+    monkeypatch.setenv("RETENTION_POLICY", '{"audio:levels": 60}')
+    assert load_policy() == DEFAULT_POLICY
+    monkeypatch.setenv("RETENTION_POLICY", '{"audio:levels": {"seconds": 60}}')
+    assert load_policy()["audio:levels"] == {"seconds": 60}
+
+
+def test_archive_appends_to_one_file_per_day(tmp_path):
+    r = FakeRedis()
+    stream = "audio:transcriptions"
+    policy = {stream: {"seconds": 60, "archive": True}}
+    manager = RetentionManager(policy, memory_budget_mb=0, archive_dir=str(tmp_path), redis_client=r)
+
+    # a pass every 30 s, each expiring the entry from a minute before
+    for step in range(8):
+        r.now_ms = NOW_MS + step * 30_000
+        r.add(stream, r.now_ms, {"text": f"entry {step}"})
+        manager.enforce()
+
+    folder = tmp_path / "audio_transcriptions"
+    files = os.listdir(folder)
+    assert files == [time.strftime("%Y%m%d", time.localtime(NOW_MS / 1000)) + ".jsonl.gz"]
+    with gzip.open(folder / files[0], "rt") as f:
+        texts = [json.loads(line)["text"] for line in f]
+    # every expired entry exactly once, in order
+    assert texts == [f"entry {step}" for step in range(5)]
+    assert r.get(retention.ARCHIVED_PREFIX + stream) is not None
@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from applications import vision_recorder
+from applications.vision_recorder import VisionRecorder
+
+
+class BrokenWriter:
+    def write(self, jpg):
+        raise BrokenPipeError("ffmpeg went away")
+
+    def close(self):
+        raise RuntimeError("ffmpeg exited with 1")
+
+
+def stop_in_thread(recorder, timeout=5.0):
+    """recorder.stop() in a thread, so a hang fails the test instead of blocking it."""
+    result = {}
+    def run():
+        try:
+            result["paths"] = recorder.stop()
+        except Exception as e:
+            result["error"] = e
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    t.join(timeout)
+    assert not t.is_alive(), "stop() hung"
+    return result
+
+
+def test_writes_mjpeg_segments(tmp_path):
+    recorder = VisionRecorder(str(tmp_path / "cam-%H%M%S.mjpeg"), fps=1, segment_seconds=10).start()
+    for i in range(25):
+        recorder.on_frame(str(i), b"\xff\xd8jpeg\xff\xd9", {"timestamp": 1_700_000_000 + i})
+
+    paths = stop_in_thread(recorder)["paths"]
+
+    assert len(paths) == 3
+    assert recorder.frames == 25
+    assert sum((tmp_path / p).stat().st_size for p in paths) == 25 * 8
+
+
+def test_writer_failure_is_raised_from_stop(tmp_path, monkeypatch):
+    monkeypatch.setattr(vision_recorder, "open_writer", lambda *args: BrokenWriter())
+    recorder = VisionRecorder(str(tmp_path / "cam.mkv"), fps=1, queue_frames=2).start()
+    recorder.on_frame("0", b"jpeg", {"timestamp": 1.0})
+    recorder._thread.join(5)
+    # the dead writer no longer drains the queue: fill it up
+    for i in range(1, 10):
+        recorder.on_frame(str(i), b"jpeg", {"timestamp": 1.0 + i})
+
+    result = stop_in_thread(recorder)
+
+    assert isinstance(result.get("error"), BrokenPipeError)
+
+
+def test_missing_ffmpeg_is_raised_from_stop(tmp_path, monkeypatch):
+    def no_ffmpeg(*args):
+        raise FileNotFoundError("ffmpeg")
+    monkeypatch.setattr(vision_recorder, "open_writer", no_ffmpeg)
+    recorder = VisionRecorder(str(tmp_path / "cam.mkv"), fps=1, queue_frames=1).start()
+    for i in range(5):
+        recorder.on_frame(str(i), b"jpeg", {"timestamp": 1.0 + i})
+
+    result = stop_in_thread(recorder)
+
+    assert isinstance(result.get("error"), FileNotFoundError)
+    with pytest.raises(FileNotFoundError):
+        recorder.stop()
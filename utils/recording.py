@@ -0,0 +1,22 @@
+"""
+utils/recording.py
+
+Helpers shared by the recorders in applications/.
+"""
+
+import os
+import time
+
+def segment_path(pattern: str, index: int, started: float, rotating: bool, taken=()) -> str:
+    """
+    Output path for a segment. `pattern` may contain strftime fields, filled
+    with the segment's start time; without any, rotating recordings get a
+    -000, -001... suffix so segments don't overwrite each other. A path
+    already in `taken` (the pattern is coarser than the segments) gets the
+    suffix too.
+    """
+    path = time.strftime(pattern, time.localtime(started))
+    if (rotating and "%" not in pattern) or path in taken:
+        root, ext = os.path.splitext(path)
+        path = f"{root}-{index:03d}{ext}"
+    return path